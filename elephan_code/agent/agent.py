@@ -1,16 +1,51 @@
+import asyncio
+import functools
 import json
 from typing import Optional, Callable, Any, List, Dict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+try:
+    import orjson
+except ImportError:  # orjson 可选，缺失时回退到标准库 json
+    orjson = None
+
 from elephan_code.llm.llm import LLMInterface, ActionModel
 from elephan_code.llm.prompt_manager import PromptManager
 from elephan_code.tools import ToolManager
+from elephan_code.tools.base_tool import ToolResult
 from elephan_code.utils.trajectory import TrajectoryRecorder
 from elephan_code.utils.logging import get_logger
 
 logger = get_logger("elephan.agent")
 
 
+@functools.lru_cache(maxsize=32)
+def _resolve_param_extractor(tp: type) -> Callable[[Any], dict]:
+    """按参数类型缓存提取函数，避免每次工具调用重复 hasattr 探测"""
+    if issubclass(tp, dict):
+        return lambda p: p
+    if hasattr(tp, "model_dump"):
+        return lambda p: p.model_dump()
+    if hasattr(tp, "dict"):
+        return lambda p: p.dict()
+    return lambda p: {}
+
+
+def _default_summarizer(dropped: List[Dict[str, str]]) -> str:
+    """确定性的低成本摘要：被截断的消息各取首行前 80 字符
+
+    不调用任何模型，只做代码级提取，让被淘汰的中间轮次在上下文里
+    留下一条线索而不是完全消失。需要更高质量摘要时可用
+    set_summarizer 换成小模型调用。
+    """
+    lines = []
+    for msg in dropped[-12:]:
+        first = msg.get("content", "").split("\n", 1)[0][:80]
+        if first:
+            lines.append(f"{msg.get('role', 'user')}: {first}")
+    return "\n".join(lines)
+
+
 DEFAULT_MAX_STEPS = 10
 DEFAULT_MAX_MEMORY_MESSAGES = 50
 DEFAULT_CONTEXT_WINDOW_TOKENS = 8000
@@ -28,6 +63,8 @@ class Agent:
         max_parallel_tools: int = DEFAULT_MAX_PARALLEL_TOOLS,
         enable_parallel: bool = True,
         mode: str = "auto",
+        sink_size: int = 2,
+        truncation_chunk: int = 8,
     ):
         self.llm = llm
         self.tools = tools
@@ -37,21 +74,44 @@ class Agent:
         self.context_window_tokens = context_window_tokens
         self.max_parallel_tools = max_parallel_tools
         self.enable_parallel = enable_parallel
+        # 截断时始终保留的前缀消息数（system prompt + 初始任务），
+        # 这两条是对话的 "attention sink"，丢弃会导致质量坍塌
+        self.sink_size = sink_size
+        # 摘要回调：截断前对被丢弃的中间消息生成一条摘要，
+        # 默认用零成本的确定性提取
+        self._summarizer: Optional[Callable[[List[Dict[str, str]]], str]] = (
+            _default_summarizer
+        )
+        # 截断节流：providers 会缓存相同 prompt 前缀的 KV，每步都改写
+        # memory 中部会让缓存每次失效；攒够 truncation_chunk 步再一次性
+        # 截断，让大多数步骤看到不变的前缀
+        self.truncation_chunk = truncation_chunk
+        self._steps_since_truncation = 0
+        # 跨 step 复用的工具执行线程池（首次并行调用时惰性创建）
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # 单线程后台队列：轨迹记录和 on_* 回调异步执行，不阻塞 step
+        self._bg: Optional[ThreadPoolExecutor] = None
 
         tools_prompt = self.tools.get_tools_prompt()
         self.prompt_manager = PromptManager(tools_prompt=tools_prompt)
 
-        schema_constraint = self._get_schema_constraint()
+        # system prompt 只依赖工具列表和 LLM 的 schema 约束，组装一次后缓存，
+        # reset() 直接复用，避免每次重新 compose 和 hasattr 探测
+        self._schema_constraint_fn = getattr(
+            llm, "_get_system_prompt_constraint", None
+        )
+        self._system_prompt_cache = self.prompt_manager.compose(
+            schema_constraint=self._get_schema_constraint()
+        )
 
-        self.memory: List[Dict[str, str]] = [
-            {
-                "role": "system",
-                "content": self.prompt_manager.compose(
-                    schema_constraint=schema_constraint
-                )
-            }
-        ]
+        self.memory: List[Dict[str, str]] = []
+        # 与 memory 平行的每条消息 token 估算值（按下标对齐）
+        self._mem_tokens: List[int] = []
+        self._total_tokens = 0
+        self._mem_append({"role": "system", "content": self._system_prompt_cache})
         self.trajectory: Optional[TrajectoryRecorder] = None
+        # 最近一次 observation（截断到 300 字符），供执行模式 O(1) 读取
+        self.last_observation: str = ""
         self.on_thought: Optional[Callable[[str], None]] = None
         self.on_action: Optional[Callable[[str, dict], None]] = None
         self.on_observation: Optional[Callable[[str], None]] = None
@@ -61,13 +121,19 @@ class Agent:
         self._execution_mode = None
         self._init_execution_mode(mode)
 
+    def set_summarizer(
+        self, fn: Optional[Callable[[List[Dict[str, str]]], str]]
+    ) -> None:
+        """替换截断摘要回调；传 None 关闭摘要"""
+        self._summarizer = fn
+
     def _get_schema_constraint(self) -> Optional[str]:
+        if self._schema_constraint_fn is None:
+            return None
         try:
-            if hasattr(self.llm, "_get_system_prompt_constraint"):
-                return self.llm._get_system_prompt_constraint()
+            return self._schema_constraint_fn()
         except Exception:
-            pass
-        return None
+            return None
 
     def _init_execution_mode(self, mode: str = "auto") -> None:
         """初始化执行模式
@@ -104,133 +170,261 @@ class Agent:
         return self._execution_mode
 
     def _generate_system_prompt(self) -> str:
-        schema_constraint = self._get_schema_constraint()
-        return self.prompt_manager.compose(schema_constraint=schema_constraint)
+        return self._system_prompt_cache
 
     def _estimate_tokens(self, text: str) -> int:
         return len(text) // 4
 
-    def _truncate_memory(self) -> None:
-        if len(self.memory) <= 2:
+    def _mem_append(self, msg: Dict[str, str]) -> None:
+        """追加消息到 memory 并维护增量 token 计数
+
+        每条消息的估算 token 数记在与 memory 按下标对齐的
+        _mem_tokens 旁路列表里，避免截断时对整个 memory 做 O(N)
+        重新扫描。不写进消息字典本身：memory 会被原样传给
+        provider SDK，多余字段会被 OpenAI 等按 unknown parameter
+        拒绝。
+        """
+        self.memory.append(msg)
+        count = self._estimate_tokens(msg.get("content", ""))
+        self._mem_tokens.append(count)
+        self._total_tokens += count
+
+    def _mem_remove(self, msg: Dict[str, str]) -> None:
+        """按值移除一条消息并同步其 token 计数
+
+        消息已被截断丢弃时静默返回。
+        """
+        try:
+            idx = self.memory.index(msg)
+        except ValueError:
             return
+        del self.memory[idx]
+        self._total_tokens -= self._mem_tokens.pop(idx)
 
-        total_tokens = sum(
-            self._estimate_tokens(m.get("content", "")) for m in self.memory
-        )
+    def _truncate_memory(self) -> None:
+        """Sink + 最近窗口截断
 
-        while len(self.memory) > 2 and (
-            len(self.memory) > self.max_memory_messages
-            or total_tokens > self.context_window_tokens
+        保留前 sink_size 条消息（system prompt + 初始任务）和最近的
+        消息窗口，一次切片丢弃中间部分，而不是逐条 pop(1)。
+        """
+        if len(self.memory) <= self.sink_size:
+            return
+        if (
+            len(self.memory) <= self.max_memory_messages
+            and self._total_tokens <= self.context_window_tokens
         ):
-            removed = self.memory.pop(1)
-            total_tokens -= self._estimate_tokens(removed.get("content", ""))
+            return
+
+        # 刚超预算时先不动前缀，攒满 truncation_chunk 步（或超出预算
+        # 25% 以上）再一次性截断
+        self._steps_since_truncation += 1
+        hard_over = self._total_tokens > self.context_window_tokens * 1.25 or (
+            len(self.memory) > self.max_memory_messages + self.truncation_chunk
+        )
+        if not hard_over and self._steps_since_truncation < self.truncation_chunk:
+            return
+        self._steps_since_truncation = 0
+
+        sink = self.memory[: self.sink_size]
+        sink_tokens = self._mem_tokens[: self.sink_size]
+        recent = self.memory[self.sink_size :]
+        recent_tokens = self._mem_tokens[self.sink_size :]
+
+        keep_recent = max(self.max_memory_messages - self.sink_size, 1)
+        if len(recent) > keep_recent:
+            recent = recent[-keep_recent:]
+            recent_tokens = recent_tokens[-keep_recent:]
+
+        total = sum(sink_tokens) + sum(recent_tokens)
+
+        # 消息数已达标后若 token 预算仍超，继续收缩窗口头部
+        start = 0
+        while start < len(recent) - 1 and total > self.context_window_tokens:
+            total -= recent_tokens[start]
+            start += 1
+        if start:
+            recent = recent[start:]
+            recent_tokens = recent_tokens[start:]
+
+        dropped_count = len(self.memory) - self.sink_size - len(recent)
+        if dropped_count > 0 and self._summarizer:
+            dropped = self.memory[self.sink_size : self.sink_size + dropped_count]
+            try:
+                summary = self._summarizer(dropped)
+            except Exception:
+                summary = ""
+            if summary:
+                summary_msg = {
+                    "role": "user",
+                    "content": f"[Summary of earlier steps]\n{summary}",
+                }
+                summary_count = self._estimate_tokens(summary_msg["content"])
+                total += summary_count
+                recent.insert(0, summary_msg)
+                recent_tokens.insert(0, summary_count)
+
+        self.memory = sink + recent
+        self._mem_tokens = sink_tokens + recent_tokens
+        self._total_tokens = total
 
     def step(self) -> bool:
         self._truncate_memory()
 
         response_data = self.llm.ask(self.memory)
-        self.memory.append(
-            {
-                "role": "assistant",
-                "content": json.dumps(response_data.model_dump_json()),
-            }
-        )
+        prepared = self._record_response(response_data)
 
-        logger.info("[Thought]: %s", response_data.thought)
+        if prepared is None:
+            return False
 
-        if self.on_thought:
-            self.on_thought(str(response_data.thought))
+        if len(prepared) == 1:
+            # 最常见情形：单 action 直接执行，跳过循环和列表装配
+            _, result = self._run_action(0, *prepared[0])
+            observations = [result]
+        elif self.enable_parallel:
+            observations = self._execute_parallel(prepared)
+        else:
+            observations = self._execute_sequential(prepared)
 
-        try:
-            if self.trajectory:
-                self.trajectory.record_thought(str(response_data.thought))
-        except Exception:
-            pass
+        self._record_observations(observations)
+        return True
 
-        actions = response_data.get_actions()
+    async def astep(self) -> bool:
+        """step() 的异步版本
 
-        if not actions:
-            return False
+        LLM 调用和工具执行都不会阻塞事件循环；多个独立工具调用
+        通过 asyncio.gather 并发完成。BuildMode/AutoMode 等异步
+        执行模式应优先调用此方法。
+        """
+        self._truncate_memory()
 
-        if any(a.name == "finish" for a in actions):
+        response_data = await self.llm.ask_async(self.memory)
+        prepared = self._record_response(response_data)
+
+        if prepared is None:
             return False
 
-        if self.enable_parallel and len(actions) > 1:
-            observations = self._execute_parallel(actions)
+        if len(prepared) == 1:
+            _, result = await asyncio.to_thread(self._run_action, 0, *prepared[0])
+            observations = [result]
+        elif self.enable_parallel:
+            observations = await self._execute_parallel_async(prepared)
         else:
-            observations = self._execute_sequential(actions)
+            observations = await asyncio.to_thread(self._execute_sequential, prepared)
 
-        combined_obs = "\n---\n".join(observations)
+        self._record_observations(observations)
+        return True
 
-        logger.info("[Observation]: %s", combined_obs)
+    def _record_response(self, response_data) -> Optional[List[tuple]]:
+        """追加助手响应并分发回调
 
-        if self.on_observation:
-            self.on_observation(combined_obs)
+        返回待执行的 (action, params) 元组列表；无 action 或出现
+        finish 时返回 None 表示本轮结束。
+        """
+        self._mem_append(
+            {
+                "role": "assistant",
+                "content": response_data.model_dump_json(),
+            }
+        )
 
-        try:
-            if self.trajectory:
-                self.trajectory.record_observation(combined_obs)
-        except Exception:
-            pass
+        logger.info("[Thought]: %s", response_data.thought)
 
-        self.memory.append({"role": "user", "content": f"Observation: {combined_obs}"})
+        if self.on_thought:
+            self._bg_submit(self.on_thought, str(response_data.thought))
 
-        return True
+        if self.trajectory:
+            self._bg_submit(
+                self.trajectory.record_thought, str(response_data.thought), retry=True
+            )
+
+        actions = response_data.get_actions()
+
+        if not actions or response_data.has_finish:
+            return None
 
-    def _execute_sequential(self, actions: List[ActionModel]) -> List[str]:
-        observations = []
+        prepared = []
         for action in actions:
             try:
                 params = self._extract_params(action.parameters)
             except Exception:
                 params = {}
+            prepared.append((action, params))
 
-            logger.info("[Action]: %s(%s)", action.name, params)
+        return prepared
 
-            if self.on_action:
-                self.on_action(action.name, params)
+    def _record_observations(self, observations: List[str]) -> None:
+        if len(observations) == 1:
+            combined_obs = observations[0]
+        else:
+            combined_obs = "\n---\n".join(observations)
+        self.last_observation = combined_obs[:300]
 
-            try:
-                if self.trajectory:
-                    self.trajectory.record_action(action.name, params)
-            except Exception:
-                pass
+        logger.info("[Observation]: %s", combined_obs)
+
+        if self.on_observation:
+            self._bg_submit(self.on_observation, combined_obs)
 
-            observation = self.tools.call(action.name, params)
-            obs_str = self._format_observation(observation)
-            observations.append(f"[{action.name}]: {obs_str}")
+        if self.trajectory:
+            self._bg_submit(
+                self.trajectory.record_observation, combined_obs, retry=True
+            )
 
-        return observations
+        self._mem_append({"role": "user", "content": f"Observation: {combined_obs}"})
 
-    def _execute_parallel(self, actions: List[ActionModel]) -> List[str]:
-        actions_to_run = actions[: self.max_parallel_tools]
-        results: Dict[int, str] = {}
+    def _execute_sequential(self, prepared: List[tuple]) -> List[str]:
+        return [
+            self._run_action(idx, action, params)[1]
+            for idx, (action, params) in enumerate(prepared)
+        ]
 
-        def run_action(idx: int, action: ActionModel) -> tuple:
-            try:
-                params = self._extract_params(action.parameters)
-            except Exception:
-                params = {}
+    def _run_action(self, idx: int, action: ActionModel, params: dict) -> tuple:
+        logger.info("[Action %d]: %s(%s)", idx, action.name, params)
 
-            logger.info("[Action %d]: %s(%s)", idx, action.name, params)
+        if self.on_action:
+            self._bg_submit(self.on_action, action.name, params)
 
-            if self.on_action:
-                self.on_action(action.name, params)
+        if self.trajectory:
+            self._bg_submit(
+                self.trajectory.record_action, action.name, params, retry=True
+            )
 
-            try:
-                if self.trajectory:
-                    self.trajectory.record_action(action.name, params)
-            except Exception:
-                pass
+        observation = self.tools.call(action.name, params)
+        obs_str = self._format_observation(observation)
+        return idx, f"[{action.name}]: {obs_str}"
+
+    def _partition_by_safety(self, actions_to_run: List[tuple]) -> tuple:
+        """按并发安全性把 (idx, action, params) 分成两组
+
+        只读工具（read_file、git_status 等）可以并发执行；其余工具
+        有副作用，保持原有顺序串行执行。
+        """
+        is_safe = getattr(self.tools, "is_concurrency_safe", None)
+        if is_safe is None:
+            return (
+                [(i, a, p) for i, (a, p) in enumerate(actions_to_run)],
+                [],
+            )
+        safe, unsafe = [], []
+        for i, (action, params) in enumerate(actions_to_run):
+            (safe if is_safe(action.name) else unsafe).append((i, action, params))
+        return safe, unsafe
+
+    def _execute_parallel(self, prepared: List[tuple]) -> List[str]:
+        actions_to_run = prepared[: self.max_parallel_tools]
+        results: Dict[int, str] = {}
+
+        if len(actions_to_run) == 1:
+            # 单个 action 没必要过线程池，直接内联执行
+            _, result = self._run_action(0, *actions_to_run[0])
+            return [result]
 
-            observation = self.tools.call(action.name, params)
-            obs_str = self._format_observation(observation)
-            return idx, f"[{action.name}]: {obs_str}"
+        safe, unsafe = self._partition_by_safety(actions_to_run)
 
-        with ThreadPoolExecutor(max_workers=self.max_parallel_tools) as executor:
+        if len(safe) > 1:
+            executor = self._get_pool()
             futures = {
-                executor.submit(run_action, i, action): i
-                for i, action in enumerate(actions_to_run)
+                executor.submit(self._run_action, i, action, params): i
+                for i, action, params in safe
             }
             for future in as_completed(futures):
                 try:
@@ -239,26 +433,113 @@ class Agent:
                 except Exception as e:
                     idx = futures[future]
                     results[idx] = f"[Error]: {str(e)}"
+        elif safe:
+            i, action, params = safe[0]
+            _, results[i] = self._run_action(i, action, params)
+
+        for i, action, params in unsafe:
+            try:
+                _, results[i] = self._run_action(i, action, params)
+            except Exception as e:
+                results[i] = f"[Error]: {str(e)}"
+
+        return [results[i] for i in sorted(results.keys())]
+
+    async def _execute_parallel_async(self, prepared: List[tuple]) -> List[str]:
+        actions_to_run = prepared[: self.max_parallel_tools]
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_parallel_tools)
+
+        async def run_one(idx: int, action: ActionModel, params: dict) -> tuple:
+            async with semaphore:
+                try:
+                    return await loop.run_in_executor(
+                        self._get_pool(), self._run_action, idx, action, params
+                    )
+                except Exception as e:
+                    return idx, f"[Error]: {str(e)}"
+
+        safe, unsafe = self._partition_by_safety(actions_to_run)
+        results: Dict[int, str] = {}
+
+        if safe:
+            gathered = await asyncio.gather(
+                *[run_one(i, action, params) for i, action, params in safe]
+            )
+            results.update(dict(gathered))
+
+        for i, action, params in unsafe:
+            idx, result = await run_one(i, action, params)
+            results[idx] = result
 
         return [results[i] for i in sorted(results.keys())]
 
+    def _bg_submit(self, fn: Callable, *args: Any, retry: bool = False) -> None:
+        """把轨迹记录/回调派发到后台单线程队列
+
+        单 worker 保证事件按提交顺序执行，step 无需等待持久化完成。
+        retry=True 时失败后重试一次，仅用于轨迹持久化写入；on_* UI
+        回调不重试——回调可能在抛异常前已产生可见副作用，重放会把
+        同一事件推送两次。
+        """
+
+        def _invoke():
+            try:
+                fn(*args)
+            except Exception as e:
+                if not retry:
+                    logger.debug("Background task failed: %s", e)
+                    return
+                try:
+                    fn(*args)
+                except Exception as e:
+                    logger.debug("Background task failed after retry: %s", e)
+
+        if self._bg is None:
+            self._bg = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="agent-bg"
+            )
+        self._bg.submit(_invoke)
+
+    def _flush_background(self) -> None:
+        """等待后台队列中已提交的任务全部执行完"""
+        if self._bg is not None:
+            self._bg.submit(lambda: None).result()
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_parallel_tools,
+                thread_name_prefix="agent-tool",
+            )
+        return self._pool
+
+    def close(self) -> None:
+        """释放跨 step 复用的线程池和后台队列"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        if self._bg is not None:
+            self._bg.shutdown(wait=True)
+            self._bg = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
     def _extract_params(self, parameters: Any) -> dict:
-        if isinstance(parameters, dict):
-            return parameters
-        if hasattr(parameters, "model_dump"):
-            return parameters.model_dump()
-        if hasattr(parameters, "dict"):
-            return parameters.dict()
-        return {}
+        return _resolve_param_extractor(type(parameters))(parameters)
 
     def _format_observation(self, observation: Any) -> str:
         try:
-            from elephan_code.tools.base_tool import ToolResult as _ToolResult
-
-            if isinstance(observation, _ToolResult):
+            if isinstance(observation, ToolResult):
                 if observation.success:
                     if isinstance(observation.data, str):
                         return observation.data
+                    if orjson is not None:
+                        return orjson.dumps(observation.data).decode()
                     return json.dumps(observation.data, ensure_ascii=False)
                 return f"Error: {observation.error}"
             return str(observation)
@@ -266,7 +547,7 @@ class Agent:
             return str(observation)
 
     def run(self, task: str) -> None:
-        self.memory.append({"role": "user", "content": task})
+        self._mem_append({"role": "user", "content": task})
         if self.trajectory:
             self.trajectory.start(task)
 
@@ -274,16 +555,13 @@ class Agent:
             if not self.step():
                 break
 
+        # 确保后台轨迹事件全部落盘后再写结束标记
+        self._flush_background()
         if self.trajectory:
             self.trajectory.end(status="completed")
 
     def reset(self) -> None:
-        schema_constraint = self._get_schema_constraint()
-        self.memory = [
-            {
-                "role": "system",
-                "content": self.prompt_manager.compose(
-                    schema_constraint=schema_constraint
-                ),
-            }
-        ]
+        self.memory = []
+        self._mem_tokens = []
+        self._total_tokens = 0
+        self._mem_append({"role": "system", "content": self._system_prompt_cache})
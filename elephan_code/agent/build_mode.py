@@ -2,6 +2,7 @@
 
 from typing import Any, Dict, Optional, Callable, TYPE_CHECKING
 import logging
+import re
 from elephan_code.agent.plan.plan_structures import StepStatus
 from elephan_code.agent.plan.plan_todo import PlanTodoManager
 
@@ -10,6 +11,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# 步骤完成信号，单次正则扫描代替多个子串查找
+_DONE_RE = re.compile(r"finish|done|completed|完成", re.IGNORECASE)
+
 
 class BuildMode:
     """构建执行模式 - 按计划步骤执行任务
@@ -66,6 +70,9 @@ class BuildMode:
                 total_agent_steps += steps_used
 
             self.is_running = False
+            # 等待后台轨迹事件/回调全部执行完，最后一步的记录才不会
+            # 在 run 返回之后才落地
+            self.agent._flush_background()
             progress = self.plan_manager.progress.get_overall_progress()
 
             result = {
@@ -97,14 +104,15 @@ class BuildMode:
         self.plan_manager.start_step(step.step_id)
         self.trigger_callback("on_step_start", step)
 
-        prompt = f"[Step {step_index + 1}/{total_steps}] {step.description}"
+        parts = [f"[Step {step_index + 1}/{total_steps}] {step.description}"]
         if step.expected_output:
-            prompt += f"\nExpected: {step.expected_output}"
+            parts.append(f"Expected: {step.expected_output}")
         if step.tools:
-            prompt += f"\nTools: {', '.join(step.tools)}"
-        prompt += "\nCall 'finish' when done with this step."
+            parts.append("Tools: " + ", ".join(step.tools))
+        parts.append("Call 'finish' when done with this step.")
+        prompt = "\n".join(parts)
 
-        self.agent.memory.append({"role": "user", "content": prompt})
+        self.agent._mem_append({"role": "user", "content": prompt})
 
         steps_used = 0
         max_for_step = min(self.max_iterations_per_step, remaining)
@@ -113,7 +121,7 @@ class BuildMode:
             if not self.is_running:
                 break
 
-            continue_running = self.agent.step()
+            continue_running = await self.agent.astep()
             steps_used += 1
 
             if not continue_running or self._is_step_done():
@@ -128,13 +136,11 @@ class BuildMode:
     def _is_step_done(self) -> bool:
         if not self.agent.memory:
             return False
-        last = self.agent.memory[-1].get("content", "")
-        signals = ["finish", "done", "completed", "完成"]
-        return any(s in last.lower() for s in signals)
+        # 只看尾部即可：完成信号总出现在最近的响应/观察末尾，
+        # 避免对整条（可能数百 KB 的）observation 做 lower+扫描
+        tail = self.agent.memory[-1].get("content", "")[-512:]
+        return bool(_DONE_RE.search(tail))
 
     def _get_last_observation(self) -> str:
-        for msg in reversed(self.agent.memory):
-            content = msg.get("content", "")
-            if "Observation:" in content:
-                return content[:300]
-        return ""
+        # Agent 在 _record_observations 中维护该属性，免去反向遍历 memory
+        return getattr(self.agent, "last_observation", "") or ""
@@ -1,13 +1,52 @@
 """智能计划决策器 - 使用 LLM 判断任务是否需要预规划"""
 
+import asyncio
+import functools
+import hashlib
 import json
 import logging
+import re
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from elephan_code.agent.plan.sync_bridge import run_coroutine_sync
+
+try:
+    import orjson
+except ImportError:  # orjson 可选，缺失时回退到标准库 json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# 单次扫描提取最外层 JSON 对象（容忍 ```json 围栏），
+# 代替多次 find/rfind 遍历响应文本
+_JSON_RE = re.compile(r"(?:```(?:json)?\s*)?(\{.*\})", re.DOTALL)
+
+# 批量决策响应中的最外层 JSON 数组
+_JSON_ARRAY_RE = re.compile(r"(?:```(?:json)?\s*)?(\[.*\])", re.DOTALL)
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_text_extractor(tp: type):
+    """按响应类型解析一次文本提取函数并缓存
+
+    LLM 客户端返回的类型集合很小（pydantic 模型、AgentResponse、str），
+    按 type 缓存提取函数后，热路径上只剩一次字典查找，省去每个响应
+    两次 hasattr 异常探测。
+    """
+    if hasattr(tp, "model_dump_json"):
+        return lambda r: r.model_dump_json()
+    if hasattr(tp, "thought"):
+        return lambda r: str(r.thought)
+    return str
+
+
+def response_to_text(response) -> str:
+    """把 LLM 客户端返回的响应对象转成文本"""
+    return _resolve_text_extractor(type(response))(response)
+
 
 class TaskComplexity(Enum):
     """任务复杂度级别"""
@@ -17,7 +56,7 @@ class TaskComplexity(Enum):
     COMPLEX = "complex"  # 复杂任务，建议规划
 
 
-@dataclass
+@dataclass(slots=True)
 class PlanDecision:
     """规划决策结果"""
 
@@ -34,6 +73,11 @@ class PlanDecision:
             "suggested_steps": self.suggested_steps,
         }
 
+    def to_json(self) -> str:
+        if orjson is not None:
+            return orjson.dumps(self.to_dict()).decode()
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
 
 class PlanDecider:
     """使用 LLM 判断任务是否需要预规划的决策器"""
@@ -63,13 +107,87 @@ class PlanDecider:
 
 仅返回 JSON 对象，不要包含其他文本。"""
 
-    def __init__(self, llm):
+    # 批量决策 prompt：一次调用分析多个任务，返回 JSON 数组
+    BATCH_DECISION_PROMPT = """你是一个任务分析专家。逐一分析以下任务列表，判断每个任务是否需要预先制定执行计划。
+
+任务列表:
+{tasks}
+
+分析标准与单任务相同（simple: 1-2 步；moderate: 3-5 步；complex: 5+ 步）。
+
+请以 JSON 数组格式返回，每个任务一个对象，按 task_index 对应:
+[
+    {{
+        "task_index": 0,
+        "needs_planning": true/false,
+        "complexity": "simple" | "moderate" | "complex",
+        "reasoning": "简短理由",
+        "suggested_steps": 0-10
+    }},
+    ...
+]
+
+仅返回 JSON 数组，不要包含其他文本。"""
+
+    # 单次批量调用包含的任务上限，避免 prompt 过长
+    BATCH_CHUNK_SIZE = 20
+
+    # 预切分模板：每次调用只做一次拼接，免去 str.format 重复解析
+    # 占位符；切分后把 format 转义的 {{ }} 还原为字面量大括号
+    _DECISION_HEAD, _DECISION_TAIL = (
+        p.replace("{{", "{").replace("}}", "}")
+        for p in DECISION_PROMPT.split("{task}")
+    )
+
+    # 明显简单/复杂任务的快速启发式：匹配时直接给出决策，
+    # 省去整个 LLM 往返；只有模糊任务才走模型分析
+    _SIMPLE_PATTERNS = re.compile(
+        r"^(read|cat|show|view|check|ls|pwd|git status|git log|display|"
+        r"读取|查看|检查|显示)\b",
+        re.IGNORECASE,
+    )
+    _COMPLEX_PATTERNS = re.compile(
+        r"\b(refactor|migrate|rewrite|test suite|重构|迁移|重写|整个|多个)\b",
+        re.IGNORECASE,
+    )
+
+    def __init__(self, llm, cache_size: int = 128, use_heuristics: bool = True):
         """初始化决策器
 
         Args:
             llm: LLM 接口实例
+            cache_size: 决策缓存容量；相同任务复用结果，省去 LLM 调用
+            use_heuristics: 是否启用正则快速通道（测试时可关闭）
         """
         self.llm = llm
+        self.cache_size = cache_size
+        self.use_heuristics = use_heuristics
+        self._cache: "OrderedDict[str, PlanDecision]" = OrderedDict()
+
+    def _heuristic_decision(self, task: str) -> Optional[PlanDecision]:
+        """尝试用正则启发式直接分类任务，无法判断时返回 None"""
+        stripped = task.strip()
+        if len(stripped) < 80 and self._SIMPLE_PATTERNS.match(stripped):
+            return PlanDecision(
+                needs_planning=False,
+                complexity=TaskComplexity.SIMPLE,
+                reasoning="Matched simple-task heuristic",
+                suggested_steps=1,
+            )
+        if self._COMPLEX_PATTERNS.search(stripped):
+            return PlanDecision(
+                needs_planning=True,
+                complexity=TaskComplexity.COMPLEX,
+                reasoning="Matched complex-task heuristic",
+                suggested_steps=7,
+            )
+        return None
+
+    @staticmethod
+    def _task_key(task: str) -> str:
+        return hashlib.blake2b(
+            task.strip().lower().encode(), digest_size=16
+        ).hexdigest()
 
     async def should_plan(self, task: str) -> PlanDecision:
         """判断任务是否需要预规划
@@ -80,36 +198,49 @@ class PlanDecider:
         Returns:
             PlanDecision 对象，包含决策结果和理由
         """
+        # 相同任务（重试/恢复/重复子步骤）直接复用缓存决策，
+        # 省去整个 LLM 往返
+        cache_key = self._task_key(task)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            logger.debug(f"Decision cache hit for task: {task[:50]}")
+            return cached
+
+        # 明显简单/复杂的任务直接走启发式快速通道
+        if self.use_heuristics:
+            decision = self._heuristic_decision(task)
+            if decision is not None:
+                logger.debug(f"Heuristic decision for task: {task[:50]}")
+                return decision
+
         logger.info(f"Analyzing task complexity: {task[:50]}...")
 
         try:
-            prompt = self.DECISION_PROMPT.format(task=task)
+            prompt = self._DECISION_HEAD + task + self._DECISION_TAIL
 
-            response = self.llm.ask(
+            # llm.ask 是阻塞调用，放到线程里执行，避免卡住事件循环
+            response = await asyncio.to_thread(
+                self.llm.ask,
                 [
                     {
                         "role": "system",
                         "content": "You are a task complexity analyzer.",
                     },
                     {"role": "user", "content": prompt},
-                ]
+                ],
             )
 
-            # 解析响应
-            if hasattr(response, "model_dump_json"):
-                response_text = response.model_dump_json()
-            elif hasattr(response, "thought"):
-                # AgentResponse 类型
-                response_text = str(response.thought)
-            else:
-                response_text = str(response)
-
             # 尝试从响应中提取 JSON
-            decision = self._parse_decision(response_text)
+            decision = self._parse_decision(response_to_text(response))
             logger.info(
                 f"Decision: needs_planning={decision.needs_planning}, "
                 f"complexity={decision.complexity.value}"
             )
+
+            self._cache[cache_key] = decision
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
             return decision
 
         except Exception as e:
@@ -131,21 +262,107 @@ class PlanDecider:
         Returns:
             PlanDecision 对象
         """
-        import asyncio
+        return run_coroutine_sync(self.should_plan(task))
+
+    async def should_plan_batch(self, tasks: list) -> list:
+        """批量判断多个任务是否需要预规划
+
+        把 N 个任务合并进一次 LLM 调用（每 BATCH_CHUNK_SIZE 个任务
+        分一批，避免 prompt 过长），代替 N 次串行往返。缓存和启发式
+        命中的任务不会进入批量 prompt；解析失败的任务回退到逐个分析。
+
+        Args:
+            tasks: 任务描述列表
+
+        Returns:
+            与 tasks 等长的 PlanDecision 列表
+        """
+        results: list = [None] * len(tasks)
+        pending = []  # (原始下标, 任务) 仍需 LLM 分析的任务
+
+        for i, task in enumerate(tasks):
+            cache_key = self._task_key(task)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                results[i] = cached
+                continue
+            if self.use_heuristics:
+                decision = self._heuristic_decision(task)
+                if decision is not None:
+                    results[i] = decision
+                    continue
+            pending.append((i, task))
+
+        for start in range(0, len(pending), self.BATCH_CHUNK_SIZE):
+            chunk = pending[start:start + self.BATCH_CHUNK_SIZE]
+            decisions = await self._ask_batch([t for _, t in chunk])
+            for (i, task), decision in zip(chunk, decisions):
+                if decision is None:
+                    # 该任务在批量响应中缺失或解析失败，逐个回退
+                    decision = await self.should_plan(task)
+                else:
+                    self._cache[self._task_key(task)] = decision
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                results[i] = decision
+
+        return results
+
+    def should_plan_batch_sync(self, tasks: list) -> list:
+        """同步版本的批量规划判断"""
+        return run_coroutine_sync(self.should_plan_batch(tasks))
+
+    async def _ask_batch(self, tasks: list) -> list:
+        """对一批任务发起单次 LLM 调用并按下标还原决策
+
+        Returns:
+            与 tasks 等长的列表，缺失/失败的位置为 None
+        """
+        task_lines = "\n".join(
+            f"{i}. {task}" for i, task in enumerate(tasks)
+        )
+        prompt = self.BATCH_DECISION_PROMPT.format(tasks=task_lines)
+        decisions: list = [None] * len(tasks)
 
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # 如果已经在异步上下文中，使用线程池
-                import concurrent.futures
-
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, self.should_plan(task))
-                    return future.result()
-            else:
-                return loop.run_until_complete(self.should_plan(task))
-        except RuntimeError:
-            return asyncio.run(self.should_plan(task))
+            response = await asyncio.to_thread(
+                self.llm.ask,
+                [
+                    {
+                        "role": "system",
+                        "content": "You are a task complexity analyzer.",
+                    },
+                    {"role": "user", "content": prompt},
+                ],
+            )
+
+            text = response_to_text(response).strip()
+            match = _JSON_ARRAY_RE.search(text)
+            if match:
+                text = match.group(1)
+            items = orjson.loads(text) if orjson is not None else json.loads(text)
+
+            for item in items:
+                idx = item.get("task_index")
+                if not isinstance(idx, int) or not 0 <= idx < len(tasks):
+                    continue
+                try:
+                    decisions[idx] = PlanDecision(
+                        needs_planning=item.get("needs_planning", True),
+                        complexity=TaskComplexity(
+                            item.get("complexity", "moderate").lower()
+                        ),
+                        reasoning=item.get("reasoning", ""),
+                        suggested_steps=item.get("suggested_steps", 5),
+                    )
+                except ValueError:
+                    continue
+
+        except Exception as e:
+            logger.warning(f"Batch decision failed, falling back per task: {e}")
+
+        return decisions
 
     def _parse_decision(self, response_text: str) -> PlanDecision:
         """解析 LLM 的决策响应
@@ -158,26 +375,13 @@ class PlanDecider:
         """
         # 尝试直接解析 JSON
         try:
-            # 尝试找到 JSON 对象
             text = response_text.strip()
 
-            # 如果包含 ```json 标记，提取其中的内容
-            if "```json" in text:
-                start = text.find("```json") + 7
-                end = text.find("```", start)
-                text = text[start:end].strip()
-            elif "```" in text:
-                start = text.find("```") + 3
-                end = text.find("```", start)
-                text = text[start:end].strip()
-
-            # 找到 JSON 对象的开始和结束
-            json_start = text.find("{")
-            json_end = text.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                text = text[json_start:json_end]
-
-            data = json.loads(text)
+            match = _JSON_RE.search(text)
+            if match:
+                text = match.group(1)
+
+            data = orjson.loads(text) if orjson is not None else json.loads(text)
 
             complexity_str = data.get("complexity", "moderate").lower()
             complexity = TaskComplexity(complexity_str)
@@ -2,16 +2,40 @@
 
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 from dataclasses import dataclass, field
+import asyncio
+import copy
+import difflib
+import hashlib
+import io
 import json
 import logging
+import re
+from collections import OrderedDict
+
+from elephan_code.agent.plan.plan_decider import response_to_text
+from elephan_code.agent.plan.sync_bridge import run_coroutine_sync
+
+try:
+    import orjson
+except ImportError:  # orjson 可选，缺失时回退到标准库 json
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson 可选，缺失时整体解析响应
+    ijson = None
 
 if TYPE_CHECKING:
     from elephan_code.agent.plan_todo import PlanTodoManager
 
 logger = logging.getLogger(__name__)
 
+# 单次扫描提取最外层 JSON 对象（容忍 ```json 围栏），
+# 代替多次 find/rfind 遍历响应文本
+_JSON_RE = re.compile(r"(?:```(?:json)?\s*)?(\{.*\})", re.DOTALL)
+
 
-@dataclass
+@dataclass(slots=True)
 class Step:
     """Plan Mode 中的步骤定义"""
 
@@ -32,7 +56,7 @@ class Step:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Plan:
     """执行计划"""
 
@@ -48,6 +72,11 @@ class Plan:
             "steps": [step.to_dict() for step in self.steps],
         }
 
+    def to_json(self) -> str:
+        if orjson is not None:
+            return orjson.dumps(self.to_dict()).decode()
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
     def get_step_descriptions(self) -> List[str]:
         """获取所有步骤的描述列表"""
         return [step.description for step in self.steps]
@@ -94,15 +123,42 @@ class PlanGenerator:
 
 返回 JSON 对象，不包含其他文本。"""
 
-    def __init__(self, llm, tool_manager=None):
+    # 预切分模板（{task} 在 {tools} 之前出现），免去每次调用的
+    # str.format 解析；切分后还原 format 转义的 {{ }}
+    _PLAN_HEAD, _PLAN_MID, _PLAN_TAIL = (
+        p.replace("{{", "{").replace("}}", "}")
+        for p in re.split(r"\{task\}|\{tools\}", PLAN_PROMPT)
+    )
+
+    def __init__(
+        self,
+        llm,
+        tool_manager=None,
+        cache_size: int = 128,
+        fuzzy_threshold: Optional[float] = 0.9,
+    ):
         """初始化计划生成器
 
         Args:
             llm: LLM 接口实例
             tool_manager: 可选的工具管理器，用于获取可用工具列表
+            cache_size: 计划缓存容量；相同任务复用计划，省去 LLM 调用
+            fuzzy_threshold: 模糊检索阈值；与某个已缓存任务的相似度
+                达到该值时复用其计划而不再调用 LLM，传 None 关闭
         """
         self.llm = llm
         self.tool_manager = tool_manager
+        self.cache_size = cache_size
+        self.fuzzy_threshold = fuzzy_threshold
+        self._cache: "OrderedDict[str, Plan]" = OrderedDict()
+        # cache_key -> 归一化后的原始任务文本，供模糊检索比对
+        self._cache_tasks: Dict[str, str] = {}
+
+    @staticmethod
+    def _task_key(task: str) -> str:
+        return hashlib.blake2b(
+            task.strip().lower().encode(), digest_size=16
+        ).hexdigest()
 
     def _get_available_tools(self) -> str:
         """获取可用工具列表"""
@@ -124,32 +180,53 @@ class PlanGenerator:
         Returns:
             生成的执行计划
         """
+        # 相同任务直接复用缓存计划；深拷贝返回，避免执行方
+        # 修改步骤状态后污染缓存
+        cache_key = self._task_key(task)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            logger.debug(f"Plan cache hit for task: {task[:50]}")
+            return copy.deepcopy(cached)
+
+        # 语义上接近的重复任务（改了个路径/措辞的同类请求）复用
+        # 已有计划模板，省去整个规划 LLM 调用
+        fuzzy = self._fuzzy_lookup(task)
+        if fuzzy is not None:
+            logger.info(f"Fuzzy plan cache hit for task: {task[:50]}")
+            plan = copy.deepcopy(fuzzy)
+            plan.task = task
+            return plan
+
         logger.info(f"Generating plan for task: {task[:50]}...")
 
         try:
             tools = self._get_available_tools()
-            prompt = self.PLAN_PROMPT.format(task=task, tools=tools)
+            prompt = (
+                self._PLAN_HEAD + task + self._PLAN_MID + tools + self._PLAN_TAIL
+            )
 
-            response = self.llm.plan_ask(
+            # plan_ask 是阻塞调用，放到线程里执行，避免卡住事件循环
+            response = await asyncio.to_thread(
+                self.llm.plan_ask,
                 [
                     {
                         "role": "system",
                         "content": "You are a planning expert. Return only valid JSON.",
                     },
                     {"role": "user", "content": prompt},
-                ]
+                ],
             )
 
             # 解析响应
-            if hasattr(response, "model_dump_json"):
-                response_text = response.model_dump_json()
-            elif hasattr(response, "thought"):
-                response_text = str(response.thought)
-            else:
-                response_text = str(response)
-
-            plan = self._parse_plan(response_text, task)
+            plan = self._parse_plan(response_to_text(response), task)
             logger.info(f"Generated plan with {len(plan)} steps")
+
+            self._cache[cache_key] = copy.deepcopy(plan)
+            self._cache_tasks[cache_key] = task.strip().lower()
+            if len(self._cache) > self.cache_size:
+                evicted, _ = self._cache.popitem(last=False)
+                self._cache_tasks.pop(evicted, None)
             return plan
 
         except Exception as e:
@@ -157,6 +234,35 @@ class PlanGenerator:
             # 返回简单的单步计划作为后备
             return self._create_fallback_plan(task)
 
+    def _fuzzy_lookup(self, task: str) -> Optional[Plan]:
+        """在缓存任务里找最相似的计划（difflib，纯标准库）
+
+        向量索引（FAISS/embedding）对本项目是重依赖；缓存容量只有
+        百级，逐条 SequenceMatcher 比对已经足够快。
+        """
+        if self.fuzzy_threshold is None or not self._cache_tasks:
+            return None
+
+        needle = task.strip().lower()
+        best_key = None
+        best_ratio = 0.0
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(needle)
+        for key, cached_task in self._cache_tasks.items():
+            matcher.set_seq1(cached_task)
+            # quick_ratio 是上界，先用它剪枝再算精确值
+            if matcher.quick_ratio() < self.fuzzy_threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= self.fuzzy_threshold and ratio > best_ratio:
+                best_key = key
+                best_ratio = ratio
+
+        if best_key is None:
+            return None
+        self._cache.move_to_end(best_key)
+        return self._cache[best_key]
+
     def generate_sync(self, task: str) -> Plan:
         """同步版本的计划生成
 
@@ -166,20 +272,7 @@ class PlanGenerator:
         Returns:
             生成的执行计划
         """
-        import asyncio
-
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                import concurrent.futures
-
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, self.generate(task))
-                    return future.result()
-            else:
-                return loop.run_until_complete(self.generate(task))
-        except RuntimeError:
-            return asyncio.run(self.generate(task))
+        return run_coroutine_sync(self.generate(task))
 
     def _parse_plan(self, response_text: str, original_task: str) -> Plan:
         """解析 LLM 的计划响应
@@ -194,22 +287,18 @@ class PlanGenerator:
         try:
             text = response_text.strip()
 
-            # 提取 JSON
-            if "```json" in text:
-                start = text.find("```json") + 7
-                end = text.find("```", start)
-                text = text[start:end].strip()
-            elif "```" in text:
-                start = text.find("```") + 3
-                end = text.find("```", start)
-                text = text[start:end].strip()
+            match = _JSON_RE.search(text)
+            if match:
+                text = match.group(1)
 
-            json_start = text.find("{")
-            json_end = text.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                text = text[json_start:json_end]
+            if ijson is not None:
+                plan = self._parse_plan_streaming(text, original_task)
+                if plan is not None:
+                    return plan
 
-            plan_dict = json.loads(text)
+            plan_dict = (
+                orjson.loads(text) if orjson is not None else json.loads(text)
+            )
 
             steps = []
             for step_dict in plan_dict.get("steps", []):
@@ -228,10 +317,41 @@ class PlanGenerator:
                 description=plan_dict.get("description", ""),
             )
 
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
+        except (ValueError, KeyError, TypeError) as e:
             logger.warning(f"Failed to parse plan JSON: {e}")
             return self._create_fallback_plan(original_task)
 
+    def _parse_plan_streaming(self, text: str, original_task: str) -> Optional[Plan]:
+        """用 ijson 流式解析计划 JSON
+
+        逐个产出 steps 数组的元素并直接构造 Step，不落地完整的
+        中间字典；步骤很多的长计划可以省掉一次整树构建。失败时
+        返回 None，由调用方回退到整体解析。
+        """
+        try:
+            data = text.encode()
+            steps = []
+            for step_dict in ijson.items(io.BytesIO(data), "steps.item"):
+                steps.append(Step(
+                    step_id=step_dict.get("step_id", len(steps) + 1),
+                    description=step_dict.get("description", ""),
+                    tools=step_dict.get("tools", []),
+                    dependencies=step_dict.get("dependencies", []),
+                    expected_output=step_dict.get("expected_output", ""),
+                ))
+
+            # 顶层标量字段单独轻量扫描（跳过 steps 子树的物化）
+            meta = {"task": original_task, "description": ""}
+            for prefix, event, value in ijson.parse(io.BytesIO(data)):
+                if event == "string" and prefix in ("task", "description"):
+                    meta[prefix] = value
+
+            return Plan(task=meta["task"], steps=steps, description=meta["description"])
+
+        except Exception as e:
+            logger.debug(f"Streaming plan parse failed, falling back: {e}")
+            return None
+
     def _create_fallback_plan(self, task: str) -> Plan:
         """创建后备单步计划
 
@@ -16,7 +16,7 @@ class StepStatus(Enum):
     BLOCKED = "blocked"              # ◆ 依赖未满足
 
 
-@dataclass
+@dataclass(slots=True)
 class StepProgress:
     """步骤进度跟踪"""
     step_id: int
@@ -24,6 +24,7 @@ class StepProgress:
     status: StepStatus = StepStatus.NOT_STARTED
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    started_monotonic: float = 0.0
     duration_seconds: Optional[float] = None
     observation: Optional[str] = None
     error_message: Optional[str] = None
@@ -52,60 +53,82 @@ class StepProgress:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class PlanProgress:
-    """整体计划进度"""
-    plan_id: str
+    """整体计划进度
+
+    状态变更应通过 set_status 进行：它同步维护按状态的增量计数，
+    让聚合查询（进度百分比、to_dict）无需每次遍历全部步骤。
+    """
+    # 默认用 id(plan) 的 int 值；外部传入的显式 ID 仍可以是字符串
+    plan_id: "int | str"
     task: str
     total_steps: int
     steps_progress: Dict[int, StepProgress] = field(default_factory=dict)
     overall_status: StepStatus = StepStatus.NOT_STARTED
-    
+    status_counts: Dict[StepStatus, int] = field(default_factory=dict)
+
     started_at: Optional[datetime] = None
     estimated_completion: Optional[datetime] = None
-    
+
+    def register_step(self, sp: StepProgress) -> None:
+        """登记一个步骤并计入其初始状态"""
+        self.steps_progress[sp.step_id] = sp
+        self.status_counts[sp.status] = self.status_counts.get(sp.status, 0) + 1
+
+    def set_status(self, step_id: int, status: StepStatus) -> None:
+        """变更步骤状态并增量更新计数"""
+        sp = self.steps_progress[step_id]
+        if sp.status is not status:
+            self.status_counts[sp.status] = self.status_counts.get(sp.status, 1) - 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            sp.status = status
+
+    def count(self, status: StepStatus) -> int:
+        """获取处于某状态的步骤数（O(1)）"""
+        return self.status_counts.get(status, 0)
+
     def get_overall_progress(self) -> float:
         """计算整体完成度（0-100%）"""
         if not self.steps_progress:
             return 0.0
-        
-        completed = sum(
-            1 for sp in self.steps_progress.values()
-            if sp.status == StepStatus.COMPLETED
-        )
-        return (completed / self.total_steps) * 100
-    
+
+        return (self.count(StepStatus.COMPLETED) / self.total_steps) * 100
+
     def get_blocked_steps(self) -> List[int]:
         """获取被阻塞的步骤"""
+        if not self.count(StepStatus.BLOCKED):
+            return []
         return [
             step_id for step_id, sp in self.steps_progress.items()
             if sp.status == StepStatus.BLOCKED
         ]
-    
+
     def get_failed_steps(self) -> List[int]:
         """获取失败的步骤"""
+        if not self.count(StepStatus.FAILED):
+            return []
         return [
             step_id for step_id, sp in self.steps_progress.items()
             if sp.status == StepStatus.FAILED
         ]
-    
+
     def get_in_progress_step(self) -> Optional[int]:
         """获取当前进行中的步骤"""
+        if not self.count(StepStatus.IN_PROGRESS):
+            return None
         for step_id, sp in self.steps_progress.items():
             if sp.status == StepStatus.IN_PROGRESS:
                 return step_id
         return None
-    
+
     def to_dict(self) -> dict:
         """转换为字典"""
         return {
             "task": self.task,
             "overall_progress": self.get_overall_progress(),
             "total_steps": self.total_steps,
-            "completed_steps": sum(
-                1 for sp in self.steps_progress.values()
-                if sp.status == StepStatus.COMPLETED
-            ),
-            "failed_steps": len(self.get_failed_steps()),
-            "blocked_steps": len(self.get_blocked_steps()),
+            "completed_steps": self.count(StepStatus.COMPLETED),
+            "failed_steps": self.count(StepStatus.FAILED),
+            "blocked_steps": self.count(StepStatus.BLOCKED),
         }
@@ -1,5 +1,6 @@
 """Plan Mode 的 Todo 管理器"""
 
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
 from elephan_code.agent.plan.plan_structures import StepProgress, PlanProgress, StepStatus
@@ -7,21 +8,32 @@ from elephan_code.utils.logging import get_logger
 
 logger = get_logger("elephan.plan_todo")
 
+# 状态图标表放在模块级，避免每次查询都重建字典
+_STATUS_ICONS = {
+    StepStatus.NOT_STARTED: "☐",
+    StepStatus.IN_PROGRESS: "⦿",
+    StepStatus.COMPLETED: "✓",
+    StepStatus.FAILED: "✗",
+    StepStatus.SKIPPED: "⊘",
+    StepStatus.BLOCKED: "◆",
+}
+
 
 class PlanTodoManager:
     """管理和追踪计划的 todo 状态"""
     
-    def __init__(self, plan, plan_id: Optional[str] = None):
+    def __init__(self, plan, plan_id: "Optional[int | str]" = None):
         """
         初始化 todo 管理器
-        
+
         Args:
             plan: Plan 对象，包含 task 和 steps
-            plan_id: 可选的计划ID，用于标识计划
+            plan_id: 可选的计划ID，用于标识计划；缺省用 id(plan) 的
+                int 值，免去每次构造的十进制字符串转换
         """
         self.plan = plan
         self.progress = PlanProgress(
-            plan_id=plan_id or str(id(plan)),
+            plan_id=plan_id if plan_id is not None else id(plan),
             task=plan.task,
             total_steps=len(plan.steps)
         )
@@ -30,12 +42,20 @@ class PlanTodoManager:
     
     def _initialize_steps(self):
         """初始化所有步骤的进度"""
-        for step in self.plan.steps:
-            self.progress.steps_progress[step.step_id] = StepProgress(
-                step_id=step.step_id,
-                description=step.description,
-                subtask_count=len(step.tools) if hasattr(step, 'tools') else 0
+        # step_id -> Step 索引，让依赖检查等查找保持 O(1)
+        self._step_by_id = {s.step_id: s for s in self.plan.steps}
+        # 一次推导建满整个进度字典，避免逐项插入触发的多次扩容；
+        # 初始状态统一为 NOT_STARTED，计数直接整体写入
+        self.progress.steps_progress = {
+            s.step_id: StepProgress(
+                step_id=s.step_id,
+                description=s.description,
+                subtask_count=len(getattr(s, 'tools', ())),
             )
+            for s in self.plan.steps
+        }
+        if self.plan.steps:
+            self.progress.status_counts[StepStatus.NOT_STARTED] = len(self.plan.steps)
     
     def start_step(self, step_id: int) -> bool:
         """
@@ -52,7 +72,10 @@ class PlanTodoManager:
             return False
         
         sp = self.progress.steps_progress[step_id]
-        sp.status = StepStatus.IN_PROGRESS
+        self.progress.set_status(step_id, StepStatus.IN_PROGRESS)
+        # 计时用 monotonic，不受系统时间调整影响且比 datetime.now 便宜；
+        # started_at 仅作为展示用的墙钟时间戳保留
+        sp.started_monotonic = time.monotonic()
         sp.started_at = datetime.now()
         logger.info(f"Step {step_id} started")
         return True
@@ -74,8 +97,10 @@ class PlanTodoManager:
             return False
         
         sp = self.progress.steps_progress[step_id]
+        # 增量维护完成计数，避免每次更新都全量扫描 subtasks
+        prev = sp.subtasks.get(subtask_name, False)
         sp.subtasks[subtask_name] = completed
-        sp.subtask_completed = sum(1 for v in sp.subtasks.values() if v)
+        sp.subtask_completed += int(completed) - int(prev)
         logger.debug(f"Step {step_id} subtask '{subtask_name}' updated: {completed}")
         return True
     
@@ -95,11 +120,11 @@ class PlanTodoManager:
             return False
         
         sp = self.progress.steps_progress[step_id]
-        sp.status = StepStatus.COMPLETED
+        self.progress.set_status(step_id, StepStatus.COMPLETED)
         sp.completed_at = datetime.now()
         sp.observation = observation
-        if sp.started_at:
-            sp.duration_seconds = (sp.completed_at - sp.started_at).total_seconds()
+        if sp.started_monotonic:
+            sp.duration_seconds = time.monotonic() - sp.started_monotonic
         else:
             sp.duration_seconds = 0.0
         logger.info(f"Step {step_id} completed in {sp.duration_seconds:.2f}s")
@@ -121,7 +146,7 @@ class PlanTodoManager:
             return False
         
         sp = self.progress.steps_progress[step_id]
-        sp.status = StepStatus.FAILED
+        self.progress.set_status(step_id, StepStatus.FAILED)
         sp.completed_at = datetime.now()
         sp.error_message = error_message
         sp.retry_count += 1
@@ -144,7 +169,7 @@ class PlanTodoManager:
             return False
         
         sp = self.progress.steps_progress[step_id]
-        sp.status = StepStatus.SKIPPED
+        self.progress.set_status(step_id, StepStatus.SKIPPED)
         sp.observation = reason
         logger.info(f"Step {step_id} skipped: {reason}")
         return True
@@ -165,7 +190,7 @@ class PlanTodoManager:
             return False
         
         sp = self.progress.steps_progress[step_id]
-        sp.status = StepStatus.BLOCKED
+        self.progress.set_status(step_id, StepStatus.BLOCKED)
         sp.observation = reason
         logger.warning(f"Step {step_id} blocked: {reason}")
         return True
@@ -184,7 +209,7 @@ class PlanTodoManager:
             logger.error(f"Step {step_id} not found")
             return False
         
-        step = next((s for s in self.plan.steps if s.step_id == step_id), None)
+        step = self._step_by_id.get(step_id)
         if not step:
             return False
         
@@ -199,42 +224,30 @@ class PlanTodoManager:
     
     def get_todo_summary(self) -> str:
         """获取 todo 列表的文本摘要"""
-        lines = [f"计划: {self.plan.task}"]
-        lines.append(f"进度: {self.progress.get_overall_progress():.1f}%")
-        lines.append("")
-        
-        for step in self.plan.steps:
+        # 预分配行列表并直接拼接各部分，摘要在每次进度更新时
+        # 都会重新渲染，减少中间字符串对象的产生
+        lines = [None] * (len(self.plan.steps) + 3)
+        lines[0] = f"计划: {self.plan.task}"
+        lines[1] = f"进度: {self.progress.get_overall_progress():.1f}%"
+        lines[2] = ""
+
+        for i, step in enumerate(self.plan.steps, start=3):
             sp = self.progress.steps_progress[step.step_id]
-            status_icon = self._get_status_icon(sp.status)
-            
-            if sp.subtask_count > 0:
-                subtask_info = f" ({sp.subtask_completed}/{sp.subtask_count})"
-            else:
-                subtask_info = ""
-            
-            duration_info = ""
-            if sp.duration_seconds:
-                duration_info = f" [{sp.duration_seconds:.1f}s]"
-            
-            lines.append(
-                f"{status_icon} [Step {step.step_id}] {step.description}"
-                f"{subtask_info}{duration_info}"
-            )
-        
+            lines[i] = "".join((
+                _STATUS_ICONS.get(sp.status, "?"),
+                " [Step ", str(step.step_id), "] ", step.description,
+                f" ({sp.subtask_completed}/{sp.subtask_count})"
+                if sp.subtask_count else "",
+                f" [{sp.duration_seconds:.1f}s]"
+                if sp.duration_seconds else "",
+            ))
+
         return "\n".join(lines)
     
     @staticmethod
     def _get_status_icon(status: StepStatus) -> str:
         """获取状态图标"""
-        icons = {
-            StepStatus.NOT_STARTED: "☐",
-            StepStatus.IN_PROGRESS: "⦿",
-            StepStatus.COMPLETED: "✓",
-            StepStatus.FAILED: "✗",
-            StepStatus.SKIPPED: "⊘",
-            StepStatus.BLOCKED: "◆",
-        }
-        return icons.get(status, "?")
+        return _STATUS_ICONS.get(status, "?")
     
     def get_progress_dict(self) -> dict:
         """获取进度的字典表示"""
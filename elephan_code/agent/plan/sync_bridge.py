@@ -0,0 +1,40 @@
+"""同步代码调用异步协程的共享桥接器
+
+`should_plan_sync`/`generate_sync` 之前每次调用都新建线程池并在其中
+`asyncio.run`，即每次构造一个全新的事件循环和默认 executor。这里改为
+进程内共享一个后台事件循环线程，所有同步入口把协程提交给它执行。
+"""
+
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+_bg_loop: Optional[asyncio.AbstractEventLoop] = None
+_bg_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """获取（必要时启动）共享的后台事件循环"""
+    global _bg_loop
+    if _bg_loop is None:
+        with _bg_loop_lock:
+            if _bg_loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name="plan-sync-loop",
+                    daemon=True,
+                )
+                thread.start()
+                _bg_loop = loop
+    return _bg_loop
+
+
+def run_coroutine_sync(coro: Coroutine) -> Any:
+    """在后台循环中执行协程并阻塞等待结果
+
+    无论调用方自身是否处于运行中的事件循环，协程都在独立的后台
+    循环线程上执行，因此不会出现 "loop is already running" 问题。
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _get_background_loop())
+    return future.result()
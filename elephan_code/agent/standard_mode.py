@@ -2,6 +2,7 @@
 
 from typing import Any, Dict, Optional, List, TYPE_CHECKING
 import logging
+import re
 from elephan_code.agent.agent_modes import AgentMode
 
 if TYPE_CHECKING:
@@ -9,6 +10,13 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# 成功信号合并成单个预编译的交替正则：一次扫描代替逐信号的
+# substring 查找，也省去整份 observation 的 .lower() 拷贝
+_SUCCESS_RE = re.compile(
+    "|".join(map(re.escape, ["完成", "成功", "done", "success", "completed", "✓"])),
+    re.IGNORECASE,
+)
+
 
 class StandardMode(AgentMode):
     """标准执行模式
@@ -26,6 +34,13 @@ class StandardMode(AgentMode):
         super().__init__(agent, "standard")
         self.current_plan: Optional["Plan"] = None
         self.current_step_index: int = 0
+        # 计划一经设置便不可变：完整上下文与每步指引只在首次访问时
+        # 渲染一次，后续迭代直接复用，不再重建字符串
+        self._plan_context_cache: str = ""
+        self._step_contexts: List[Optional[str]] = []
+        # 上一条注入 memory 的步骤指引消息；下次注入前先移除它，
+        # 保证计划指引在上下文中始终只占一条消息
+        self._step_context_msg: Optional[Dict[str, str]] = None
 
     def set_plan(self, plan: Optional["Plan"]) -> None:
         """设置执行计划
@@ -35,28 +50,34 @@ class StandardMode(AgentMode):
         """
         self.current_plan = plan
         self.current_step_index = 0
+        self._plan_context_cache = ""
+        self._step_contexts = [None] * len(plan.steps) if plan else []
         if plan:
             logger.info(f"Plan set with {len(plan)} steps")
 
     def _get_current_step_context(self) -> str:
-        """获取当前步骤的上下文提示"""
-        if not self.current_plan or self.current_step_index >= len(
-            self.current_plan.steps
-        ):
+        """获取当前步骤的上下文提示（按步骤下标惰性缓存）"""
+        idx = self.current_step_index
+        if not self.current_plan or idx >= len(self.current_plan.steps):
             return ""
 
-        step = self.current_plan.steps[self.current_step_index]
-        remaining = len(self.current_plan.steps) - self.current_step_index
+        cached = self._step_contexts[idx]
+        if cached is not None:
+            return cached
+
+        step = self.current_plan.steps[idx]
+        remaining = len(self.current_plan.steps) - idx
 
         context = f"""
 [执行计划指导]
-当前步骤 ({self.current_step_index + 1}/{len(self.current_plan.steps)}): {step.description}
+当前步骤 ({idx + 1}/{len(self.current_plan.steps)}): {step.description}
 预期使用工具: {", ".join(step.tools) if step.tools else "自动选择"}
 预期输出: {step.expected_output or "完成步骤目标"}
 剩余步骤: {remaining - 1}
 
 请专注于完成当前步骤。完成后我会告诉你下一步。
 """
+        self._step_contexts[idx] = context
         return context
 
     def _advance_step(self) -> bool:
@@ -110,47 +131,23 @@ class StandardMode(AgentMode):
             else:
                 full_task = task
 
-            self.agent.memory.append({"role": "user", "content": full_task})
+            self.agent._mem_append({"role": "user", "content": full_task})
 
             if self.agent.trajectory:
                 self.agent.trajectory.start(task)
 
-            steps_taken = 0
-            plan_steps_completed = 0
-
-            for _ in range(max_steps):
-                if not self.is_running:
-                    break
-
-                # 如果有计划，检查当前步骤并添加引导
-                if self.current_plan and self.current_step_index < len(
-                    self.current_plan.steps
-                ):
-                    step_context = self._get_current_step_context()
-                    if step_context and steps_taken > 0:
-                        # 在后续步骤添加引导上下文
-                        self.agent.memory.append(
-                            {"role": "user", "content": step_context}
-                        )
-
-                # 执行一步
-                if not self.agent.step():
-                    break
-
-                steps_taken += 1
-
-                # 如果有计划，检查是否完成当前步骤
-                if self.current_plan:
-                    # 简单启发式：每执行一步就推进计划步骤
-                    # 更复杂的实现可以分析 observation 来判断
-                    if self._should_advance_step():
-                        if not self._advance_step():
-                            # 所有计划步骤完成
-                            plan_steps_completed = len(self.current_plan.steps)
-                            break
-                        plan_steps_completed = self.current_step_index
+            # 循环实现一次性选定：无计划时走不带计划分支的紧凑路径
+            if self.current_plan:
+                steps_taken, plan_steps_completed = await self._run_planned(
+                    max_steps
+                )
+            else:
+                steps_taken = await self._run_freeform(max_steps)
+                plan_steps_completed = 0
 
             if self.agent.trajectory:
+                # 确保后台轨迹事件全部落盘后再写结束标记
+                self.agent._flush_background()
                 self.agent.trajectory.end(status="completed")
 
             self.is_running = False
@@ -184,11 +181,71 @@ class StandardMode(AgentMode):
             # 清理计划状态
             self.current_plan = None
             self.current_step_index = 0
+            self._step_context_msg = None
+
+    async def _run_freeform(self, max_steps: int) -> int:
+        """无计划的紧凑执行循环"""
+        steps_taken = 0
+        for _ in range(max_steps):
+            if not self.is_running or not await self.agent.astep():
+                break
+            steps_taken += 1
+        return steps_taken
+
+    async def _run_planned(self, max_steps: int) -> tuple:
+        """带计划引导与推进判断的执行循环
+
+        Returns:
+            (steps_taken, plan_steps_completed)
+        """
+        steps_taken = 0
+        plan_steps_completed = 0
+
+        for _ in range(max_steps):
+            if not self.is_running:
+                break
+
+            if self.current_step_index < len(self.current_plan.steps):
+                step_context = self._get_current_step_context()
+                if step_context and steps_taken > 0:
+                    # 替换而不是累积：先摘掉上一条指引再追加新的，
+                    # 计划指引开销恒为一条消息
+                    prev = self._step_context_msg
+                    if prev is not None:
+                        # 已被截断丢弃时 _mem_remove 静默返回
+                        self.agent._mem_remove(prev)
+                    msg = {"role": "user", "content": step_context}
+                    self.agent._mem_append(msg)
+                    self._step_context_msg = msg
+
+            # 执行一步（异步版本，LLM 调用不阻塞事件循环）
+            if not await self.agent.astep():
+                break
+
+            steps_taken += 1
+
+            # 简单启发式：observation 出现成功信号就推进计划步骤
+            if self._should_advance_step():
+                if not self._advance_step():
+                    # 所有计划步骤完成
+                    plan_steps_completed = len(self.current_plan.steps)
+                    break
+                plan_steps_completed = self.current_step_index
+
+        return steps_taken, plan_steps_completed
 
     def _build_plan_context(self) -> str:
-        """构建完整的计划上下文"""
+        """构建完整的计划上下文
+
+        输出刻意保持与当前步骤无关（不含游标等动态标记）：它进入
+        对话开头的首条消息，provider 的 prompt 缓存按前缀字节匹配，
+        前缀不变才能跨步骤命中。当前步骤的指引由
+        _get_current_step_context 以尾部消息形式动态注入。
+        """
         if not self.current_plan:
             return ""
+        if self._plan_context_cache:
+            return self._plan_context_cache
 
         lines = [
             "[执行计划]",
@@ -198,15 +255,15 @@ class StandardMode(AgentMode):
         ]
 
         for i, step in enumerate(self.current_plan.steps):
-            prefix = "→ " if i == self.current_step_index else "  "
-            lines.append(f"{prefix}{i + 1}. {step.description}")
+            lines.append(f"  {i + 1}. {step.description}")
             if step.tools:
                 lines.append(f"     工具: {', '.join(step.tools)}")
 
         lines.append("")
-        lines.append(f"从步骤 1 开始执行。")
+        lines.append("从步骤 1 开始执行。")
 
-        return "\n".join(lines)
+        self._plan_context_cache = "\n".join(lines)
+        return self._plan_context_cache
 
     def _should_advance_step(self) -> bool:
         """判断是否应该推进到下一步
@@ -224,6 +281,5 @@ class StandardMode(AgentMode):
 
         content = last_message.get("content", "")
 
-        # 如果 observation 包含成功信号，推进步骤
-        success_signals = ["完成", "成功", "done", "success", "completed", "✓"]
-        return any(signal in content.lower() for signal in success_signals)
+        # 成功标记通常出现在 observation 尾部，只扫描最后一段即可
+        return bool(_SUCCESS_RE.search(content[-2048:]))
@@ -1,11 +1,107 @@
+import asyncio
 import json
 import re
+import threading
 from typing import List, Dict, Any, Optional, Iterator, Callable
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 from abc import ABC, abstractmethod
 
+from elephan_code.llm.stream_parser import StreamingJsonParser
+from elephan_code.utils.logging import get_logger
+
+logger = get_logger("elephan.llm")
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to stdlib json
+    orjson = None
+
+# Async OpenAI-compatible clients shared per (api_key, base_url) so
+# concurrent agents reuse one connection pool instead of paying a fresh
+# TCP/TLS handshake per manager instance.
+_ASYNC_CLIENTS: Dict[tuple, Any] = {}
+_ASYNC_CLIENTS_LOCK = threading.Lock()
+
+# One process-wide sync HTTP pool shared by every OpenAI-compatible
+# manager, so multi-agent runs don't multiply TLS handshakes and sockets.
+_SYNC_HTTP_CLIENT: Optional[Any] = None
+
+
+def _get_shared_http_client():
+    global _SYNC_HTTP_CLIENT
+    if _SYNC_HTTP_CLIENT is None:
+        with _ASYNC_CLIENTS_LOCK:
+            if _SYNC_HTTP_CLIENT is None:
+                try:
+                    import httpx
+                except ImportError:
+                    # Some environments ship the openai SDK built on the
+                    # httpx2 fork instead of httpx; same API, either
+                    # client is accepted by the SDKs we pass it to.
+                    import httpx2 as httpx
+
+                _SYNC_HTTP_CLIENT = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=100, max_keepalive_connections=50
+                    ),
+                    timeout=60,
+                )
+    return _SYNC_HTTP_CLIENT
+
+
+def close_shared_clients() -> None:
+    """Close the process-wide HTTP pool and cached async clients.
+
+    Only needed by embedders that want a clean shutdown; everything is
+    recreated lazily on next use.
+    """
+    global _SYNC_HTTP_CLIENT
+    with _ASYNC_CLIENTS_LOCK:
+        if _SYNC_HTTP_CLIENT is not None:
+            _SYNC_HTTP_CLIENT.close()
+            _SYNC_HTTP_CLIENT = None
+        _ASYNC_CLIENTS.clear()
+
+
+def _get_async_openai_client(api_key: str, base_url: Optional[str]):
+    key = (api_key, base_url)
+    client = _ASYNC_CLIENTS.get(key)
+    if client is None:
+        try:
+            from openai import AsyncOpenAI
+        except ImportError:
+            raise ImportError(
+                "openai>=1.0.0 is required. Install with: pip install -U openai"
+            )
+        with _ASYNC_CLIENTS_LOCK:
+            client = _ASYNC_CLIENTS.get(key)
+            if client is None:
+                kwargs = {"api_key": api_key}
+                if base_url:
+                    kwargs["base_url"] = base_url
+                client = AsyncOpenAI(**kwargs)
+                _ASYNC_CLIENTS[key] = client
+    return client
+
+
+# Compiled once; the fallback parse path shouldn't re-hash the pattern
+# through re's internal cache on every malformed response.
+_FENCE_RE = re.compile(r"```json\s*|\s*```")
+
+
+# Responses are rebuilt every turn and never mutated afterwards: frozen
+# immutable instances with assignment validation off. extra='ignore'
+# drops unknown fields instead of rejecting them — models routinely add
+# stray keys (e.g. "confidence") and an otherwise usable answer should
+# not turn into a recovery round-trip.
+_RESPONSE_MODEL_CONFIG = ConfigDict(
+    frozen=True, extra="ignore", validate_assignment=False
+)
+
 
 class ActionModel(BaseModel):
+    model_config = _RESPONSE_MODEL_CONFIG
+
     name: str = Field(..., description="Tool name")
     parameters: Dict[str, Any] = Field(
         default_factory=dict, description="Tool parameters"
@@ -13,6 +109,8 @@ class ActionModel(BaseModel):
 
 
 class AgentResponse(BaseModel):
+    model_config = _RESPONSE_MODEL_CONFIG
+
     thought: str = Field(..., description="Reasoning process")
     action: Optional[ActionModel] = Field(
         default=None, description="Single action (legacy)"
@@ -32,42 +130,209 @@ class AgentResponse(BaseModel):
     def is_parallel(self) -> bool:
         return self.actions is not None and len(self.actions) > 1
 
+    @property
+    def has_finish(self) -> bool:
+        return any(a.name == "finish" for a in self.get_actions())
+
 
 class ResponseParser:
     @staticmethod
-    def clean_and_parse(raw_text: str) -> Dict[str, Any]:
-        clean_text = re.sub(r"```json\s*|\s*```", "", raw_text).strip()
+    def _extract_json(text: str) -> Optional[str]:
+        # Single forward scan: find the first '{' and slice out the balanced
+        # object, tracking string literals so braces inside values don't
+        # confuse the depth count. One O(n) pass over the raw response,
+        # which also handles ```json fences naturally (the object simply
+        # starts inside the fence), with no regex backtracking risk.
+        start = text.find("{")
+        if start == -1:
+            return None
+
+        depth = 0
+        in_string = False
+        escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start : i + 1]
+        return None
 
+    @staticmethod
+    def clean_and_parse(raw_text: str) -> Dict[str, Any]:
+        # Fast path: a well-behaved model returns a bare JSON object with
+        # no surrounding prose, so two endpoint checks replace the scan.
+        stripped = raw_text.strip()
+        if stripped.startswith("{") and stripped.endswith("}"):
+            try:
+                if orjson is not None:
+                    return orjson.loads(stripped)
+                return json.loads(stripped)
+            except ValueError:
+                pass
+
+        candidate = ResponseParser._extract_json(raw_text)
+        if candidate is not None:
+            try:
+                if orjson is not None:
+                    return orjson.loads(candidate)
+                return json.loads(candidate)
+            except ValueError:
+                pass
+
+        # Fallback for outputs the scanner can't pin down (e.g. truncated
+        # or non-object JSON after fence stripping).
+        clean_text = _FENCE_RE.sub("", raw_text).strip()
         try:
             return json.loads(clean_text)
         except json.JSONDecodeError:
-            match = re.search(r"(\{.*\})", raw_text, re.DOTALL)
-            if match:
+            raise ValueError(f"Could not parse LLM output as JSON: {raw_text[:100]}...")
+
+    @staticmethod
+    def parse_response(raw_text: str) -> "AgentResponse":
+        # Happy path: validate the extracted JSON substring directly with
+        # pydantic-core (one Rust-side pass) instead of json.loads followed
+        # by model_validate walking the dict a second time. Bare objects
+        # skip even the extraction scan.
+        stripped = raw_text.strip()
+        if stripped.startswith("{") and stripped.endswith("}"):
+            candidate = stripped
+        else:
+            candidate = ResponseParser._extract_json(raw_text)
+        if candidate is not None:
+            try:
+                return AgentResponse.model_validate_json(candidate)
+            except ValidationError:
                 try:
-                    return json.loads(match.group(1))
+                    json.loads(candidate)
                 except json.JSONDecodeError:
+                    # Malformed JSON, not a schema mismatch: let the legacy
+                    # clean-and-parse path take its shot below.
                     pass
-            raise ValueError(f"Could not parse LLM output as JSON: {raw_text[:100]}...")
+                else:
+                    raise
+        return AgentResponse.model_validate(ResponseParser.clean_and_parse(raw_text))
 
 
 class LLMInterface(ABC):
+    # Pre-built frozen error actions shared by every provider;
+    # model_copy(update=...) clones without re-running validation, so the
+    # failure paths stop constructing fresh models from scratch.
+    _RECOVER_ACTION = ActionModel(name="recover_from_error")
+    _SYSTEM_ERROR_ACTION = ActionModel(name="system_error")
+
+    @classmethod
+    def _format_error_response(cls, ve: ValidationError) -> AgentResponse:
+        return AgentResponse(
+            thought=f"Format error: {str(ve)}",
+            action=cls._RECOVER_ACTION.model_copy(
+                update={"parameters": {"error": ve.errors()}}
+            ),
+        )
+
+    @classmethod
+    def _system_error_response(cls, e: Exception) -> AgentResponse:
+        return AgentResponse(
+            thought="System error occurred.",
+            action=cls._SYSTEM_ERROR_ACTION.model_copy(
+                update={"parameters": {"message": str(e)}}
+            ),
+        )
+
     @abstractmethod
     def ask(self, messages: List[Dict[str, str]]) -> AgentResponse:
         raise NotImplementedError
 
+    async def ask_async(self, messages: List[Dict[str, str]]) -> AgentResponse:
+        # Default: run the blocking ask in a worker thread so callers on an
+        # event loop are never blocked. Managers with native async clients
+        # override this to issue the HTTP call directly.
+        return await asyncio.to_thread(self.ask, messages)
+
+    def _iter_text_deltas(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        # Providers that support streaming implement this as a generator
+        # yielding raw text deltas; the shared ask_stream below owns
+        # accumulation, callbacks, early stop and parsing.
+        raise NotImplementedError
+
     def ask_stream(
         self,
         messages: List[Dict[str, str]],
         on_token: Optional[Callable[[str], None]] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
     ) -> AgentResponse:
-        return self.ask(messages)
+        try:
+            deltas = self._iter_text_deltas(messages)
+        except NotImplementedError:
+            return self.ask(messages)
+
+        try:
+            # Accumulate chunks in a list and join once: repeated str
+            # concatenation is quadratic over long generations.
+            parts = []
+            parser = StreamingJsonParser()
+            for token in deltas:
+                parts.append(token)
+                if on_token:
+                    on_token(token)
+                if parser.consume(token):
+                    # Top-level object closed: anything further is
+                    # trailing prose, so stop paying for it. Closing the
+                    # generator runs the provider's cleanup.
+                    close = getattr(deltas, "close", None)
+                    if close is not None:
+                        close()
+                    break
+                if on_partial is not None:
+                    snapshot = parser.get()
+                    if snapshot is not None:
+                        on_partial(snapshot)
+
+            return ResponseParser.parse_response("".join(parts))
+
+        except ValidationError as ve:
+            return self._format_error_response(ve)
+        except Exception as e:
+            return self._system_error_response(e)
+
+    # Schema constraint text is identical for every manager instance;
+    # computed lazily once and shared class-wide.
+    _schema_prompt: Optional[str] = None
 
     def _get_system_prompt_constraint(self) -> str:
-        schema = AgentResponse.model_json_schema()
-        return f"\nCRITICAL: Your response MUST be a valid JSON object matching this schema:\n{json.dumps(schema, indent=2)}"
+        if LLMInterface._schema_prompt is None:
+            schema = AgentResponse.model_json_schema()
+            if orjson is not None:
+                schema_json = orjson.dumps(
+                    schema, option=orjson.OPT_INDENT_2
+                ).decode()
+            else:
+                schema_json = json.dumps(schema, indent=2)
+            LLMInterface._schema_prompt = (
+                "\nCRITICAL: Your response MUST be a valid JSON object "
+                f"matching this schema:\n{schema_json}"
+            )
+        return LLMInterface._schema_prompt
 
 
 class OpenRouterManager(LLMInterface):
+    # Built once; avoids constructing the same headers dict per request.
+    _EXTRA_HEADERS = {
+        "HTTP-Referer": "https://github.com/ElephantGit/Elephan-Code.git",
+        "X-Title": "Elephan-Code",
+    }
+
     def __init__(
         self,
         api_key: str,
@@ -88,7 +353,11 @@ class OpenRouterManager(LLMInterface):
                     "openai>=1.0.0 is required. Install with: pip install -U openai"
                 )
 
-            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+            self._client = OpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=_get_shared_http_client(),
+            )
         return self._client
 
     def plan_ask(self, messages: List[Dict[str, str]]) -> str:
@@ -98,15 +367,11 @@ class OpenRouterManager(LLMInterface):
             resp = client.chat.completions.create(
                 model=self.model_id,
                 messages=messages,
-                extra_headers={
-                    "HTTP-Referer": "https://github.com/ElephantGit/Elephan-Code.git",
-                    "X-Title": "Elephan-Code",
-                },
+                extra_headers=self._EXTRA_HEADERS,
             )
-            content = ""
-            if resp.choices:
-                msg = resp.choices[0].message
-                content = msg.content or ""
+            # v1 client responses are typed models: index directly. An empty
+            # choices list is abnormal and lands in the except handler below.
+            content = resp.choices[0].message.content or ""
             return content
         except Exception as e:
             logger.error(f"Error in OpenRouterManager.ask: {e}")
@@ -119,74 +384,55 @@ class OpenRouterManager(LLMInterface):
             resp = client.chat.completions.create(
                 model=self.model_id,
                 messages=messages,
-                extra_headers={
-                    "HTTP-Referer": "https://github.com/ElephantGit/Elephan-Code.git",
-                    "X-Title": "Elephan-Code",
-                },
+                extra_headers=self._EXTRA_HEADERS,
             )
 
-            content = ""
-            if resp.choices:
-                msg = resp.choices[0].message
-                content = msg.content or ""
+            # v1 client responses are typed models: index directly. An empty
+            # choices list is abnormal and lands in the except handler below.
+            content = resp.choices[0].message.content or ""
 
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
+            return ResponseParser.parse_response(content)
 
         except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
+            return self._format_error_response(ve)
         except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+            return self._system_error_response(e)
 
-    def ask_stream(
-        self,
-        messages: List[Dict[str, str]],
-        on_token: Optional[Callable[[str], None]] = None,
-    ) -> AgentResponse:
-        client = self._get_client()
+    async def ask_async(self, messages: List[Dict[str, str]]) -> AgentResponse:
+        client = _get_async_openai_client(self.api_key, self.base_url)
 
         try:
-            stream = client.chat.completions.create(
+            resp = await client.chat.completions.create(
                 model=self.model_id,
                 messages=messages,
-                stream=True,
-                extra_headers={
-                    "HTTP-Referer": "https://github.com/ElephantGit/Elephan-Code.git",
-                    "X-Title": "Elephan-Code",
-                },
+                extra_headers=self._EXTRA_HEADERS,
             )
 
-            content = ""
-            for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    token = chunk.choices[0].delta.content
-                    content += token
-                    if on_token:
-                        on_token(token)
+            # v1 client responses are typed models: index directly. An empty
+            # choices list is abnormal and lands in the except handler below.
+            content = resp.choices[0].message.content or ""
 
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
+            return ResponseParser.parse_response(content)
 
         except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
+            return self._format_error_response(ve)
         except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+            return self._system_error_response(e)
+
+    def _iter_text_deltas(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        client = self._get_client()
+        stream = client.chat.completions.create(
+            model=self.model_id,
+            messages=messages,
+            stream=True,
+            extra_headers=self._EXTRA_HEADERS,
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
 
 
 class OpenAIManager(LLMInterface):
@@ -207,7 +453,10 @@ class OpenAIManager(LLMInterface):
                     "openai>=1.0.0 is required. Install with: pip install -U openai"
                 )
 
-            kwargs = {"api_key": self.api_key}
+            kwargs = {
+                "api_key": self.api_key,
+                "http_client": _get_shared_http_client(),
+            }
             if self.base_url:
                 kwargs["base_url"] = self.base_url
             self._client = OpenAI(**kwargs)
@@ -221,61 +470,45 @@ class OpenAIManager(LLMInterface):
                 model=self.model_id, messages=messages
             )
 
-            content = ""
-            if resp.choices:
-                content = resp.choices[0].message.content or ""
+            # v1 client responses are typed models: index directly. An empty
+            # choices list is abnormal and lands in the except handler below.
+            content = resp.choices[0].message.content or ""
 
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
+            return ResponseParser.parse_response(content)
 
         except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
+            return self._format_error_response(ve)
         except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+            return self._system_error_response(e)
 
-    def ask_stream(
-        self,
-        messages: List[Dict[str, str]],
-        on_token: Optional[Callable[[str], None]] = None,
-    ) -> AgentResponse:
-        client = self._get_client()
+    async def ask_async(self, messages: List[Dict[str, str]]) -> AgentResponse:
+        client = _get_async_openai_client(self.api_key, self.base_url)
 
         try:
-            stream = client.chat.completions.create(
-                model=self.model_id, messages=messages, stream=True
+            resp = await client.chat.completions.create(
+                model=self.model_id, messages=messages
             )
 
-            content = ""
-            for chunk in stream:
-                if chunk.choices and chunk.choices[0].delta.content:
-                    token = chunk.choices[0].delta.content
-                    content += token
-                    if on_token:
-                        on_token(token)
+            content = resp.choices[0].message.content or ""
 
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
+            return ResponseParser.parse_response(content)
 
         except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
+            return self._format_error_response(ve)
         except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+            return self._system_error_response(e)
+
+    def _iter_text_deltas(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        client = self._get_client()
+        stream = client.chat.completions.create(
+            model=self.model_id, messages=messages, stream=True
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
 
 
 class AnthropicManager(LLMInterface):
@@ -284,10 +517,14 @@ class AnthropicManager(LLMInterface):
         api_key: str,
         model_id: str = "claude-3-5-sonnet-20241022",
         max_tokens: int = 4096,
+        enable_prompt_cache: bool = True,
     ):
         self.api_key = api_key
         self.model_id = model_id
         self.max_tokens = max_tokens
+        # Mark the stable prompt prefix (system prompt + initial task) with
+        # cache_control so the provider reuses its KV cache across steps.
+        self.enable_prompt_cache = enable_prompt_cache
         self._client = None
 
     def _get_client(self):
@@ -299,22 +536,52 @@ class AnthropicManager(LLMInterface):
                     "anthropic is required. Install with: pip install anthropic"
                 )
 
-            self._client = Anthropic(api_key=self.api_key)
+            # Same process-wide pool the OpenAI-compatible managers use;
+            # the anthropic SDK accepts any httpx.Client.
+            self._client = Anthropic(
+                api_key=self.api_key, http_client=_get_shared_http_client()
+            )
         return self._client
 
     def _convert_messages(self, messages: List[Dict[str, str]]) -> tuple:
+        # Single pass over the full history each turn; keep the loop body
+        # to one role lookup plus one append with a pre-bound method.
         system_prompt = ""
         converted = []
+        append = converted.append
 
         for msg in messages:
             role = msg.get("role", "user")
-            content = msg.get("content", "")
-
             if role == "system":
-                system_prompt = content
+                system_prompt = msg.get("content", "")
             else:
-                anthropic_role = "assistant" if role == "assistant" else "user"
-                converted.append({"role": anthropic_role, "content": content})
+                append(
+                    {
+                        "role": "assistant" if role == "assistant" else "user",
+                        "content": msg.get("content", ""),
+                    }
+                )
+
+        if self.enable_prompt_cache:
+            if system_prompt:
+                system_prompt = [
+                    {
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ]
+            if converted and converted[0]["role"] == "user":
+                converted[0] = {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": converted[0]["content"],
+                            "cache_control": {"type": "ephemeral"},
+                        }
+                    ],
+                }
 
         return system_prompt, converted
 
@@ -334,58 +601,24 @@ class AnthropicManager(LLMInterface):
             if resp.content:
                 content = resp.content[0].text
 
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
+            return ResponseParser.parse_response(content)
 
         except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
+            return self._format_error_response(ve)
         except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+            return self._system_error_response(e)
 
-    def ask_stream(
-        self,
-        messages: List[Dict[str, str]],
-        on_token: Optional[Callable[[str], None]] = None,
-    ) -> AgentResponse:
+    def _iter_text_deltas(self, messages: List[Dict[str, str]]) -> Iterator[str]:
         client = self._get_client()
         system_prompt, converted_messages = self._convert_messages(messages)
 
-        try:
-            content = ""
-            with client.messages.stream(
-                model=self.model_id,
-                max_tokens=self.max_tokens,
-                system=system_prompt,
-                messages=converted_messages,
-            ) as stream:
-                for text in stream.text_stream:
-                    content += text
-                    if on_token:
-                        on_token(text)
-
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
-
-        except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
-        except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+        with client.messages.stream(
+            model=self.model_id,
+            max_tokens=self.max_tokens,
+            system=system_prompt,
+            messages=converted_messages,
+        ) as stream:
+            yield from stream.text_stream
 
 
 class OllamaManager(LLMInterface):
@@ -416,55 +649,19 @@ class OllamaManager(LLMInterface):
 
             content = resp.get("message", {}).get("content", "")
 
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
+            return ResponseParser.parse_response(content)
 
         except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
+            return self._format_error_response(ve)
         except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+            return self._system_error_response(e)
 
-    def ask_stream(
-        self,
-        messages: List[Dict[str, str]],
-        on_token: Optional[Callable[[str], None]] = None,
-    ) -> AgentResponse:
+    def _iter_text_deltas(self, messages: List[Dict[str, str]]) -> Iterator[str]:
         client = self._get_client()
-
-        try:
-            content = ""
-            for chunk in client.chat(
-                model=self.model_id, messages=messages, stream=True
-            ):
-                token = chunk.get("message", {}).get("content", "")
-                if token:
-                    content += token
-                    if on_token:
-                        on_token(token)
-
-            data_dict = ResponseParser.clean_and_parse(content)
-            return AgentResponse.model_validate(data_dict)
-
-        except ValidationError as ve:
-            return AgentResponse(
-                thought=f"Format error: {str(ve)}",
-                action=ActionModel(
-                    name="recover_from_error", parameters={"error": ve.errors()}
-                ),
-            )
-        except Exception as e:
-            return AgentResponse(
-                thought="System error occurred.",
-                action=ActionModel(name="system_error", parameters={"message": str(e)}),
-            )
+        for chunk in client.chat(model=self.model_id, messages=messages, stream=True):
+            token = chunk.get("message", {}).get("content", "")
+            if token:
+                yield token
 
 
 class LLMFactory:
@@ -475,6 +672,11 @@ class LLMFactory:
         "ollama": OllamaManager,
     }
 
+    # Managers are stateless apart from their lazily created client, so
+    # repeated build_runtime calls with the same settings can share one
+    # instance (and therefore one client/connection pool).
+    _manager_cache: Dict[tuple, LLMInterface] = {}
+
     @staticmethod
     def get_llm(provider: str, **kwargs) -> LLMInterface:
         provider = provider.lower()
@@ -485,21 +687,34 @@ class LLMFactory:
                 f"Provider '{provider}' not supported. Available: {available}"
             )
 
+        try:
+            cache_key = (provider, tuple(sorted(kwargs.items())))
+        except TypeError:
+            cache_key = None
+        if cache_key is not None:
+            cached = LLMFactory._manager_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         manager_class = LLMFactory.PROVIDERS[provider]
 
         if provider == "ollama":
-            return manager_class(
+            manager = manager_class(
                 model_id=kwargs.get("model_id", "llama3.1"),
                 base_url=kwargs.get("base_url", "http://localhost:11434"),
             )
-
-        api_key = kwargs.get("api_key")
-        if not api_key:
-            raise ValueError(f"api_key is required for provider '{provider}'")
-
-        return manager_class(
-            api_key=api_key, **{k: v for k, v in kwargs.items() if k != "api_key"}
-        )
+        else:
+            # kwargs is our own local dict (built from **kwargs), so pop
+            # in place instead of allocating a filtered copy per call.
+            api_key = kwargs.pop("api_key", None)
+            if not api_key:
+                raise ValueError(f"api_key is required for provider '{provider}'")
+
+            manager = manager_class(api_key=api_key, **kwargs)
+
+        if cache_key is not None:
+            LLMFactory._manager_cache[cache_key] = manager
+        return manager
 
     @staticmethod
     def list_providers() -> List[str]:
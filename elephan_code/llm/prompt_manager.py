@@ -29,16 +29,26 @@ class PromptManager:
         self.tools_prompt = tools_prompt
         self.examples = examples or []
         self.template = template or self.DEFAULT_TEMPLATE
+        # compose() 的结果按全部输入做键缓存：工具集稳定时（常见情况）
+        # 每个 agent step 都命中，免去排序与多段字符串拼接
+        self._compose_cache: Dict[tuple, str] = {}
+        # 工具列表渲染结果与其来源快照；初始化时预先渲染一次，
+        # 之后只有 self.tools 真的变了才重新排序拼接
+        self._rendered_tools: Optional[tuple] = None
+        self._render_tools()
 
     def _render_tools(self) -> str:
         if self.tools_prompt:
             return self.tools_prompt
         if not self.tools:
             return "- (no tools registered)"
-        lines = []
-        for t in sorted(self.tools):
-            lines.append(f"- {t}")
-        return "\n".join(lines)
+        key = tuple(self.tools)
+        cached = self._rendered_tools
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        text = "\n".join(f"- {t}" for t in sorted(key))
+        self._rendered_tools = (key, text)
+        return text
 
     def _render_examples(self) -> str:
         if not self.examples:
@@ -51,6 +61,21 @@ class PromptManager:
         schema_constraint: Optional[str] = None,
         additional_tools: Optional[List[str]] = None,
     ) -> str:
+        # 公开属性可能被调用方改动，全部纳入缓存键；元组构造是 O(n)
+        # 的廉价操作，字符串哈希在 CPython 里首次计算后会被缓存
+        key = (
+            tuple(self.tools),
+            self.tools_prompt,
+            self.template,
+            tuple(self.examples),
+            task,
+            schema_constraint,
+            tuple(additional_tools) if additional_tools else None,
+        )
+        cached = self._compose_cache.get(key)
+        if cached is not None:
+            return cached
+
         tools_section = "Available tools:\n" + self._render_tools()
 
         if additional_tools:
@@ -64,4 +89,8 @@ class PromptManager:
         prompt += self._render_examples()
         if schema_constraint:
             prompt += "\n" + schema_constraint
+
+        if len(self._compose_cache) > 32:
+            self._compose_cache.clear()
+        self._compose_cache[key] = prompt
         return prompt
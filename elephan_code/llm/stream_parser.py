@@ -0,0 +1,114 @@
+"""Incremental JSON assembly for streamed LLM responses.
+
+Streaming callers previously had to wait for the full response before any
+structure was visible, and kept reading the stream even after the JSON
+object had closed. StreamingJsonParser tracks bracket/string state per
+delta so consumers can stop reading as soon as the top-level object is
+balanced, and can surface best-effort partial objects (e.g. a growing
+``thought``) while tokens are still arriving.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to stdlib json
+    orjson = None
+
+
+class StreamingJsonParser:
+    """Assemble one top-level JSON object from stream deltas.
+
+    ``consume`` is O(len(chunk)): it advances string/escape state and the
+    bracket stack incrementally, never re-scanning earlier input. Leading
+    prose (including ```` ```json ```` fences) before the first ``{`` is
+    skipped, and anything after the balanced closing brace is dropped.
+    ``done`` flips once the object closes, which lets stream loops break
+    early instead of draining trailing tokens.
+
+    ``get`` returns a snapshot of the object parsed so far by closing
+    whatever string/brackets are still open, or None when the prefix is
+    not yet completable. Each call joins and re-parses the accumulated
+    text, so callers emitting per-delta partials pay O(n) per call —
+    acceptable for UI updates, but worth throttling on very long streams.
+    """
+
+    __slots__ = ("done", "_parts", "_stack", "_in_string", "_escaped", "_started")
+
+    def __init__(self) -> None:
+        self.done = False
+        self._parts: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+
+    def consume(self, chunk: str) -> bool:
+        """Feed one stream delta; returns True once the object is complete."""
+        if self.done or not chunk:
+            return self.done
+
+        start = 0
+        if not self._started:
+            start = chunk.find("{")
+            if start == -1:
+                return False  # still inside leading prose or a fence
+            self._started = True
+
+        stack = self._stack
+        for i in range(start, len(chunk)):
+            ch = chunk[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                stack.append("}" if ch == "{" else "]")
+            elif ch == "}" or ch == "]":
+                if stack:
+                    stack.pop()
+                if not stack:
+                    self.done = True
+                    self._parts.append(chunk[start : i + 1])
+                    return True
+
+        self._parts.append(chunk[start:] if start else chunk)
+        return False
+
+    def text(self) -> str:
+        """The accumulated JSON text (prose before the object excluded)."""
+        return "".join(self._parts)
+
+    def get(self) -> Optional[Dict[str, Any]]:
+        """Best-effort parse of what has arrived so far."""
+        if not self._started:
+            return None
+
+        text = self.text()
+        if not self.done:
+            if self._escaped:
+                text = text[:-1]  # drop a dangling backslash
+            if self._in_string:
+                text += '"'
+            else:
+                # A prefix ending in ',' can never close cleanly; drop it
+                # so snapshots taken between fields still parse.
+                trimmed = text.rstrip()
+                if trimmed.endswith(","):
+                    text = trimmed[:-1]
+            # Close innermost structures first.
+            text += "".join(reversed(self._stack))
+
+        try:
+            if orjson is not None:
+                return orjson.loads(text)
+            return json.loads(text)
+        except ValueError:
+            # Prefix ends mid-token (e.g. after '"key":'); not closable yet.
+            return None
@@ -1,10 +1,16 @@
 from __future__ import annotations
+import json
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 from abc import ABC, abstractmethod
 
+try:
+    import orjson
+except ImportError:  # orjson 可选，缺失时回退到标准库 json
+    orjson = None
 
-@dataclass
+
+@dataclass(slots=True)
 class ToolResult:
     success: bool
     data: Optional[Any] = None
@@ -13,7 +19,7 @@ class ToolResult:
     meta: Optional[Dict[str, Any]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolParameter:
     """工具参数描述"""
 
@@ -25,16 +31,25 @@ class ToolParameter:
     enum: Optional[List[Any]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ToolSchema:
     """工具的完整 Schema 描述"""
 
     name: str
     description: str
     parameters: List[ToolParameter] = field(default_factory=list)
+    # Schema 在工具 __init__ 里构造后只读；两种渲染各在首次访问时
+    # 物化一次，后续每个 LLM turn 直接复用
+    _json_cache: Optional[Dict[str, Any]] = field(
+        default=None, repr=False, compare=False
+    )
+    _prompt_cache: Optional[str] = field(default=None, repr=False, compare=False)
 
     def to_json_schema(self) -> Dict[str, Any]:
-        """转换为 JSON Schema 格式"""
+        """转换为 JSON Schema 格式（返回共享的缓存对象，调用方勿修改）"""
+        if self._json_cache is not None:
+            return self._json_cache
+
         properties: Dict[str, Any] = {}
         required: List[str] = []
 
@@ -52,7 +67,7 @@ class ToolSchema:
             if param.required:
                 required.append(param.name)
 
-        return {
+        self._json_cache = {
             "name": self.name,
             "description": self.description,
             "parameters": {
@@ -61,20 +76,35 @@ class ToolSchema:
                 "required": required,
             },
         }
+        return self._json_cache
+
+    def to_json_bytes(self) -> bytes:
+        """序列化为 JSON 字节串（orjson 直接产出 bytes，免中间 str）"""
+        schema = self.to_json_schema()
+        if orjson is not None:
+            return orjson.dumps(schema)
+        return json.dumps(schema, ensure_ascii=False).encode()
 
     def to_prompt_string(self) -> str:
         """转换为可读的 prompt 字符串"""
-        params_str = []
-        for p in self.parameters:
+        if self._prompt_cache is not None:
+            return self._prompt_cache
+
+        # 预分配并按下标写入，避免 append 的增长再分配
+        params_str: List[str] = [""] * len(self.parameters)
+        for i, p in enumerate(self.parameters):
             req = "(required)" if p.required else "(optional)"
             enum_str = f", one of: {p.enum}" if p.enum else ""
             default_str = f", default: {p.default}" if p.default is not None else ""
-            params_str.append(
+            params_str[i] = (
                 f"    - {p.name} ({p.type}, {req}): {p.description}{enum_str}{default_str}"
             )
 
         params_section = "\n".join(params_str) if params_str else "    (no parameters)"
-        return f"- {self.name}: {self.description}\n  Parameters:\n{params_section}"
+        self._prompt_cache = (
+            f"- {self.name}: {self.description}\n  Parameters:\n{params_section}"
+        )
+        return self._prompt_cache
 
 
 class BaseTool(ABC):
@@ -1,13 +1,24 @@
 from __future__ import annotations
 import subprocess
 import json
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Optional
 from .base_tool import BaseTool, ToolResult, ToolSchema, ToolParameter
 
+try:
+    import orjson
+except ImportError:  # orjson 可选，缺失时回退到标准库 json
+    orjson = None
+
 
 class EnvTool(BaseTool):
+    # 安装的包在一个任务内基本不变；pip 子进程要几百毫秒，按 TTL
+    # 缓存其输出
+    _DEPS_CACHE_TTL = 30.0
+
     def __init__(self):
         super().__init__("env_tool")
+        self._deps_cache: Optional[tuple] = None  # (monotonic 时间戳, 数据)
         self._schema = ToolSchema(
             name="env_tool",
             description="Check environment information and dependencies",
@@ -18,7 +29,14 @@ class EnvTool(BaseTool):
                     description="The operation to perform",
                     required=True,
                     enum=["check_deps", "list_env"],
-                )
+                ),
+                ToolParameter(
+                    name="refresh",
+                    type="boolean",
+                    description="Bypass the cached package list (check_deps only)",
+                    required=False,
+                    default=False,
+                ),
             ],
         )
 
@@ -32,13 +50,29 @@ class EnvTool(BaseTool):
 
     def check_deps(self, **params) -> ToolResult:
         # run `pip list --format=json`
+        cached = self._deps_cache
+        if (
+            cached is not None
+            and not params.get("refresh")
+            and time.monotonic() - cached[0] < self._DEPS_CACHE_TTL
+        ):
+            return ToolResult(success=True, data=cached[1])
+
         try:
+            # 按字节捕获：json.loads 直接吃 bytes，stderr 仅失败时才解码
             result = subprocess.run(
-                ["pip", "list", "--format=json"], capture_output=True, text=True
+                ["pip", "list", "--format=json"], capture_output=True
             )
             if result.returncode != 0:
-                return ToolResult(success=False, error=result.stderr)
-            data = json.loads(result.stdout)
+                return ToolResult(
+                    success=False, error=result.stderr.decode("utf-8", "replace")
+                )
+            data = (
+                orjson.loads(result.stdout)
+                if orjson is not None
+                else json.loads(result.stdout)
+            )
+            self._deps_cache = (time.monotonic(), data)
             return ToolResult(success=True, data=data)
         except Exception as e:
             return ToolResult(success=False, error=str(e))
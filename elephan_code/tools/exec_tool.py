@@ -2,44 +2,112 @@ from __future__ import annotations
 import shlex
 import subprocess
 import re
-from typing import Any, Dict, List, Optional, Set
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
 from .base_tool import BaseTool, ToolResult, ToolSchema, ToolParameter
 
-
-DANGEROUS_PATTERNS: List[str] = [
+# 输出按 64KB 块读取，头尾各最多保留 32 块（约 2MB），中间丢弃：
+# 无论子进程输出多大，内存占用都有上界
+_OUT_CHUNK = 65536
+_OUT_KEEP_CHUNKS = 32
+_TRUNCATION_MARK = b"\n... [output truncated] ...\n"
+
+
+def _drain_capped(stream, sink: List[bytes]) -> None:
+    """后台线程：读空管道，只保留头尾各 _OUT_KEEP_CHUNKS 块"""
+    head: List[bytes] = []
+    tail: deque = deque(maxlen=_OUT_KEEP_CHUNKS)
+    truncated = False
+    while True:
+        block = stream.read(_OUT_CHUNK)
+        if not block:
+            break
+        if len(head) < _OUT_KEEP_CHUNKS:
+            head.append(block)
+        else:
+            if len(tail) == tail.maxlen:
+                truncated = True
+            tail.append(block)
+    data = b"".join(head)
+    if tail:
+        data += (_TRUNCATION_MARK if truncated else b"") + b"".join(tail)
+    sink.append(data)
+
+
+# 只在 token 边界（串首、空白、引号或 ;|&、反引号、$( 之后）才有
+# 意义的模式；锚定把无意义的串中间命中排除掉，同时空白/引号也算
+# 边界，sudo/env/nohup/sh -c 等包装前缀后的命令仍会被检出
+DANGEROUS_PREFIX_PATTERNS: List[str] = [
     r"rm\s+(-[rfRF]+\s+)?/",
     r"rm\s+(-[rfRF]+\s+)?\*",
     r"mkfs\.",
     r"dd\s+.*of=/dev/",
-    r">\s*/dev/sd",
     r"chmod\s+(-[rR]+\s+)?777\s+/",
     r"chown\s+.*\s+/",
+    r"eval\s+.*\$",
+    r"rm\s+.*--no-preserve-root",
+]
+
+# 出现在命令任意位置都危险的模式
+DANGEROUS_SUBSTRING_PATTERNS: List[str] = [
+    r">\s*/dev/sd",
     r":()\{.*\|.*&\s*\};:",
     r"curl.*\|\s*(ba)?sh",
     r"wget.*\|\s*(ba)?sh",
-    r"eval\s+.*\$",
     r">\s*/etc/",
-    r"rm\s+.*--no-preserve-root",
 ]
 
-BLOCKED_COMMANDS: Set[str] = {
-    "reboot",
-    "shutdown",
-    "halt",
-    "poweroff",
-    "init",
-    "mkfs",
-    "fdisk",
-    "parted",
-    "mount",
-    "umount",
-    "iptables",
-    "systemctl",
-    "service",
-}
+# 兼容旧名字：外部代码/测试按整个列表扩展时仍然可用
+DANGEROUS_PATTERNS: List[str] = (
+    DANGEROUS_PREFIX_PATTERNS + DANGEROUS_SUBSTRING_PATTERNS
+)
+
+# 含有这些字符的命令串才需要 shlex 的引号/转义语义；
+# 其余走 C 实现的 str.split 即可
+_NEEDS_SHLEX_RE = re.compile(r"[\"'\\$`&|<>;]")
+
+# 在 import 时合并成两个交替正则：一次扫描代替逐 pattern 的 N 次
+# re.search（每次还要走 re 模块内部的 pattern 缓存查找）；
+# 按是否需要命令位置锚定分组，两个状态机都更小
+_DANGER_PREFIX_RE = re.compile(
+    r"(?:^|[\s;&|`'\"]|\$\()\s*(?:"
+    + "|".join(f"(?:{p})" for p in DANGEROUS_PREFIX_PATTERNS)
+    + ")",
+    re.IGNORECASE,
+)
+_DANGER_ANY_RE = re.compile(
+    "|".join(f"(?:{p})" for p in DANGEROUS_SUBSTRING_PATTERNS), re.IGNORECASE
+)
+
+# 报错信息里剥掉命中串前面的锚定字符，只留模式本体
+_ANCHOR_CHARS = " \t;&|`$('\""
+
+BLOCKED_COMMANDS: frozenset = frozenset(
+    {
+        "reboot",
+        "shutdown",
+        "halt",
+        "poweroff",
+        "init",
+        "mkfs",
+        "fdisk",
+        "parted",
+        "mount",
+        "umount",
+        "iptables",
+        "systemctl",
+        "service",
+    }
+)
 
 
 class ExecTool(BaseTool):
+    # 以类属性暴露编译好的模式：所有实例共享一份，子类或测试想收紧
+    # 规则时覆盖属性即可，不必重新编译模块级对象
+    _danger_prefix_re = _DANGER_PREFIX_RE
+    _danger_any_re = _DANGER_ANY_RE
+
     def __init__(self, enable_sandbox: bool = True):
         super().__init__("exec_tool")
         self.enable_sandbox = enable_sandbox
@@ -75,27 +143,22 @@ class ExecTool(BaseTool):
             ],
         )
 
-    def _normalize_command(self, command: Any) -> List[str]:
-        if isinstance(command, list):
-            return [str(c) for c in command]
-        if isinstance(command, str):
-            return shlex.split(command)
-        raise ValueError("command must be str or list[str]")
-
     def _is_dangerous(self, command_str: str) -> Optional[str]:
         """检查命令是否包含危险操作，返回匹配的危险模式或 None"""
         if not self.enable_sandbox:
             return None
 
-        cmd_lower = command_str.lower()
-
-        first_word = cmd_lower.split()[0] if cmd_lower.split() else ""
+        # 只取首 token 并只小写它，不再整串 lower + 两次 split
+        tokens = command_str.split(None, 1)
+        first_word = tokens[0].lower() if tokens else ""
         if first_word in BLOCKED_COMMANDS:
             return f"Blocked command: {first_word}"
 
-        for pattern in DANGEROUS_PATTERNS:
-            if re.search(pattern, command_str, re.IGNORECASE):
-                return f"Dangerous pattern detected: {pattern}"
+        m = self._danger_prefix_re.search(command_str) or self._danger_any_re.search(
+            command_str
+        )
+        if m:
+            return f"Dangerous pattern detected: {m.group(0).lstrip(_ANCHOR_CHARS)}"
 
         return None
 
@@ -108,7 +171,17 @@ class ExecTool(BaseTool):
         if not cmd:
             return ToolResult(success=False, error="Missing 'command' parameter")
 
-        cmd_str = cmd if isinstance(cmd, str) else " ".join(str(c) for c in cmd)
+        # 规范化只做一遍：list 输入 stringify 一次并复用其 join 结果做
+        # 危险检查，str 输入等检查通过后再做一次 shlex 分词
+        if isinstance(cmd, str):
+            cmd_str = cmd
+            args = None
+        elif isinstance(cmd, list):
+            args = [str(c) for c in cmd]
+            cmd_str = " ".join(args)
+        else:
+            return ToolResult(success=False, error="command must be str or list[str]")
+
         danger_reason = self._is_dangerous(cmd_str)
         if danger_reason:
             return ToolResult(
@@ -117,25 +190,57 @@ class ExecTool(BaseTool):
             )
 
         try:
-            args = self._normalize_command(cmd)
-            result = subprocess.run(
+            if args is None:
+                # 简单 argv 串（无引号/转义等元字符）跳过 shlex 的
+                # 纯 Python 逐字符词法分析
+                if _NEEDS_SHLEX_RE.search(cmd) is None:
+                    args = cmd.split()
+                else:
+                    args = shlex.split(cmd)
+            # 按字节捕获，decode 一次且 errors="replace"：省掉 text 模式
+            # 的增量解码，坏字节也不会让整条命令失败。两个读取线程把
+            # stdout/stderr 各自限幅，不再把任意大的输出整个缓冲进内存。
+            # 注意：这里刻意不用 shell=True / preexec_fn——二者都会把
+            # CPython 踢出 posix_spawn/vfork 快速路径，退回 fork 并复制
+            # 本进程（可能很大）的页表
+            proc = subprocess.Popen(
                 args,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 cwd=cwd,
                 env=env,
             )
+            out_sink: List[bytes] = []
+            err_sink: List[bytes] = []
+            readers = (
+                threading.Thread(
+                    target=_drain_capped, args=(proc.stdout, out_sink), daemon=True
+                ),
+                threading.Thread(
+                    target=_drain_capped, args=(proc.stderr, err_sink), daemon=True
+                ),
+            )
+            for t in readers:
+                t.start()
+
+            try:
+                returncode = proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired as te:
+                proc.kill()
+                proc.wait()
+                return ToolResult(success=False, error=f"Timeout: {te}")
+
+            for t in readers:
+                t.join()
 
             data = {
-                "exit_code": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
+                "exit_code": returncode,
+                "stdout": out_sink[0].decode("utf-8", "replace"),
+                "stderr": err_sink[0].decode("utf-8", "replace"),
             }
-            success = result.returncode == 0
-            return ToolResult(success=success, data=data, exit_code=result.returncode)
+            return ToolResult(
+                success=(returncode == 0), data=data, exit_code=returncode
+            )
 
-        except subprocess.TimeoutExpired as te:
-            return ToolResult(success=False, error=f"Timeout: {te}")
         except Exception as e:
             return ToolResult(success=False, error=str(e))
@@ -1,13 +1,19 @@
 from __future__ import annotations
 import os
 import shutil
+from collections import OrderedDict
 from typing import Any
 from .base_tool import BaseTool, ToolResult, ToolSchema, ToolParameter
 
 
 class FileTool(BaseTool):
+    # 同一会话内反复读取相同文件很常见；按 (path, mtime_ns, size)
+    # 缓存解码结果，文件一旦改动键即失效
+    _READ_CACHE_MAX = 64
+
     def __init__(self):
         super().__init__("file_tool")
+        self._read_cache: "OrderedDict[tuple, str]" = OrderedDict()
         self._schema = ToolSchema(
             name="file_tool",
             description="Read or write files on the filesystem",
@@ -32,6 +38,12 @@ class FileTool(BaseTool):
                     description="Content to write (required for write action)",
                     required=False,
                 ),
+                ToolParameter(
+                    name="max_bytes",
+                    type="integer",
+                    description="Read at most this many bytes (read action only)",
+                    required=False,
+                ),
             ],
         )
 
@@ -51,20 +63,57 @@ class FileTool(BaseTool):
 
         try:
             if action == "read":
-                with open(path, "r", encoding="utf-8") as f:
-                    data = f.read()
+                max_bytes = params.get("max_bytes")
+                st = os.stat(path)
+                key = (path, st.st_mtime_ns, st.st_size, max_bytes)
+                data = self._read_cache.get(key)
+                if data is not None:
+                    self._read_cache.move_to_end(key)
+                    return ToolResult(success=True, data=data)
+
+                # 二进制整块读取 + 一次 decode，绕过文本模式的增量
+                # 解码缓冲；max_bytes 在读取时截断，超大文件不会整个
+                # 物化进内存再丢弃
+                with open(path, "rb") as f:
+                    raw = f.read(max_bytes) if max_bytes else f.read()
+                data = raw.decode("utf-8", errors="replace")
+                if max_bytes and st.st_size > max_bytes:
+                    data += (
+                        f"\n... [truncated at {max_bytes} of {st.st_size} bytes]"
+                    )
+
+                self._read_cache[key] = data
+                if len(self._read_cache) > self._READ_CACHE_MAX:
+                    self._read_cache.popitem(last=False)
                 return ToolResult(success=True, data=data)
 
             elif action == "write":
                 content = params.get("content", "")
-                # create backup
+                # create backup; 硬链接是 O(1) 的元数据操作：随后
+                # os.replace 换入新 inode，.bak 仍指向旧 inode/内容。
+                # 跨文件系统或已存在同名 .bak 时回退到 copyfile
+                # （其内部走内核 sendfile 快路径）
                 if os.path.exists(path):
                     backup = path + ".bak"
-                    shutil.copy2(path, backup)
-                # atomic write via temp file
+                    try:
+                        if os.path.exists(backup):
+                            os.unlink(backup)
+                        os.link(path, backup)
+                    except OSError:
+                        shutil.copyfile(path, backup)
+                # atomic write via temp file; 预先 encode 后直接
+                # os.write，跳过 TextIOWrapper 及其增量编码器。
+                # os.write 可能发生短写，循环直到整个缓冲写完，
+                # 否则 os.replace 会把截断的文件换上去
                 tmp_path = path + ".tmp"
-                with open(tmp_path, "w", encoding="utf-8") as f:
-                    f.write(content)
+                data = content.encode("utf-8")
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view) :]
+                finally:
+                    os.close(fd)
                 os.replace(tmp_path, path)
                 return ToolResult(success=True, data="File write successfully.")
 
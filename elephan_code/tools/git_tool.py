@@ -1,12 +1,21 @@
 from __future__ import annotations
+import os
 import subprocess
 from typing import Dict, Any, List
 from .base_tool import BaseTool, ToolResult, ToolSchema, ToolParameter
 
+try:
+    import pygit2
+except ImportError:  # pygit2 可选，缺失时 status 走子进程
+    pygit2 = None
+
 
 class GitTool(BaseTool):
     def __init__(self):
         super().__init__("git_tool")
+        # cwd -> 已打开的 pygit2 Repository；复用省去每次 status 的
+        # 进程启动与仓库发现
+        self._repo_cache: Dict[str, Any] = {}
         self._schema = ToolSchema(
             name="git_tool",
             description="Execute git commands for version control operations",
@@ -38,11 +47,12 @@ class GitTool(BaseTool):
             else:
                 args = list(cmd)
 
-            result = subprocess.run(args, capture_output=True, text=True, cwd=cwd)
+            # 按字节捕获，decode 一次且 errors="replace"，见 exec_tool
+            result = subprocess.run(args, capture_output=True, cwd=cwd)
             data = {
                 "exit_code": result.returncode,
-                "stdout": result.stdout,
-                "stderr": result.stderr,
+                "stdout": result.stdout.decode("utf-8", "replace"),
+                "stderr": result.stderr.decode("utf-8", "replace"),
             }
             return ToolResult(
                 success=(result.returncode == 0), data=data, exit_code=result.returncode
@@ -50,13 +60,66 @@ class GitTool(BaseTool):
         except Exception as e:
             return ToolResult(success=False, error=str(e))
 
+    @staticmethod
+    def _porcelain_code(flags: int) -> str:
+        """把 pygit2 状态位映射成 porcelain 的两字母码"""
+        if flags & pygit2.GIT_STATUS_WT_NEW:
+            return "??"
+        x = y = " "
+        if flags & pygit2.GIT_STATUS_INDEX_NEW:
+            x = "A"
+        elif flags & pygit2.GIT_STATUS_INDEX_MODIFIED:
+            x = "M"
+        elif flags & pygit2.GIT_STATUS_INDEX_DELETED:
+            x = "D"
+        elif flags & pygit2.GIT_STATUS_INDEX_RENAMED:
+            x = "R"
+        if flags & pygit2.GIT_STATUS_WT_MODIFIED:
+            y = "M"
+        elif flags & pygit2.GIT_STATUS_WT_DELETED:
+            y = "D"
+        return x + y
+
     def status(self, **params) -> ToolResult:
+        # pygit2 可用时走进程内路径（libgit2），免去 fork/exec 与每次
+        # 的仓库重新发现；输出保持 porcelain 形状。任何异常都静默
+        # 回退到子进程实现
+        if pygit2 is not None:
+            cwd = params.get("cwd") or os.getcwd()
+            try:
+                repo = self._repo_cache.get(cwd)
+                if repo is None:
+                    repo = pygit2.Repository(cwd)
+                    self._repo_cache[cwd] = repo
+                entries = repo.status()
+                lines = [
+                    f"{self._porcelain_code(flags)} {path}"
+                    for path, flags in entries.items()
+                    if not flags & pygit2.GIT_STATUS_IGNORED
+                ]
+                stdout = "\n".join(lines) + ("\n" if lines else "")
+                return ToolResult(
+                    success=True,
+                    data={"exit_code": 0, "stdout": stdout, "stderr": ""},
+                    exit_code=0,
+                )
+            except Exception:
+                self._repo_cache.pop(cwd, None)
         return self.run(cmd=["git", "status", "--porcelain"], **params)
 
     def branch(self, name: str, **params) -> ToolResult:
         return self.run(cmd=["git", "checkout", "-b", name], **params)
 
-    def commit(self, message: str, **params) -> ToolResult:
+    def commit(self, message: str, add_all: bool = False, **params) -> ToolResult:
+        # commit -a 一次进程即可提交所有已跟踪改动（进程启动占提交
+        # 耗时的大头），但它不会带上未跟踪文件。先查 status（pygit2
+        # 可用时在进程内完成），只在没有未跟踪文件时才走单进程快
+        # 路径，保持"新建文件也会被提交"的原有约定。add_all=True
+        # 跳过探测，直接 add -A + commit 两步
+        if not add_all:
+            st = self.status(**params)
+            if st.success and "??" not in (st.data or {}).get("stdout", ""):
+                return self.run(cmd=["git", "commit", "-a", "-m", message], **params)
         add_result = self.run(cmd=["git", "add", "-A"], **params)
         if not add_result.success:
             return add_result
@@ -1,3 +1,4 @@
+from functools import partial
 from typing import Callable, Dict, Any, List, Optional
 from .base_tool import ToolResult, ToolSchema, ToolParameter, BaseTool
 from .file_tool import FileTool
@@ -7,10 +8,15 @@ from .env_tool import EnvTool
 
 
 class ToolManager:
+    # 只读工具可以安全并发执行；不在集合内的工具（写文件、shell、
+    # git 提交等）默认视为有副作用，按顺序串行执行
+    _CONCURRENCY_SAFE = {"read_file", "git_status", "check_deps", "list_env"}
+
     def __init__(self, enable_sandbox: bool = True):
         self.tools: Dict[str, Callable[..., ToolResult]] = {}
         self._schemas: Dict[str, ToolSchema] = {}
         self._tool_instances: Dict[str, BaseTool] = {}
+        self._concurrency_safe = set(self._CONCURRENCY_SAFE)
 
         file_tool = FileTool()
         exec_tool = ExecTool(enable_sandbox=enable_sandbox)
@@ -24,7 +30,7 @@ class ToolManager:
 
         self._register_with_schema(
             "read_file",
-            lambda **p: file_tool.run(action="read", **p),
+            partial(file_tool.run, action="read"),
             ToolSchema(
                 name="read_file",
                 description="Read content from a file",
@@ -34,13 +40,19 @@ class ToolManager:
                         type="string",
                         description="Path to the file to read",
                         required=True,
-                    )
+                    ),
+                    ToolParameter(
+                        name="max_bytes",
+                        type="integer",
+                        description="Read at most this many bytes",
+                        required=False,
+                    ),
                 ],
             ),
         )
         self._register_with_schema(
             "write_file",
-            lambda **p: file_tool.run(action="write", **p),
+            partial(file_tool.run, action="write"),
             ToolSchema(
                 name="write_file",
                 description="Write content to a file (creates backup if file exists)",
@@ -63,7 +75,7 @@ class ToolManager:
 
         self._register_with_schema(
             "execute_shell",
-            lambda **p: exec_tool.run(**p),
+            exec_tool.run,
             ToolSchema(
                 name="execute_shell",
                 description="Execute a shell command with optional timeout and working directory",
@@ -93,7 +105,7 @@ class ToolManager:
 
         self._register_with_schema(
             "git",
-            lambda **p: git_tool.run(**p),
+            git_tool.run,
             ToolSchema(
                 name="git",
                 description="Execute git commands",
@@ -115,7 +127,7 @@ class ToolManager:
         )
         self._register_with_schema(
             "git_status",
-            lambda **p: git_tool.status(**p),
+            git_tool.status,
             ToolSchema(
                 name="git_status",
                 description="Get git repository status",
@@ -131,7 +143,7 @@ class ToolManager:
         )
         self._register_with_schema(
             "git_branch",
-            lambda **p: git_tool.branch(**p),
+            git_tool.branch,
             ToolSchema(
                 name="git_branch",
                 description="Create and checkout a new git branch",
@@ -153,7 +165,7 @@ class ToolManager:
         )
         self._register_with_schema(
             "git_commit",
-            lambda **p: git_tool.commit(**p),
+            git_tool.commit,
             ToolSchema(
                 name="git_commit",
                 description="Stage all changes and create a commit",
@@ -164,6 +176,13 @@ class ToolManager:
                         description="Commit message",
                         required=True,
                     ),
+                    ToolParameter(
+                        name="add_all",
+                        type="boolean",
+                        description="Always stage via 'git add -A' instead of probing for untracked files first",
+                        required=False,
+                        default=False,
+                    ),
                     ToolParameter(
                         name="cwd",
                         type="string",
@@ -175,11 +194,11 @@ class ToolManager:
         )
 
         self._register_with_schema(
-            "env", lambda **p: env_tool.run(**p), env_tool.schema
+            "env", env_tool.run, env_tool.schema
         )
         self._register_with_schema(
             "check_deps",
-            lambda **p: env_tool.run(action="check_deps", **p),
+            partial(env_tool.run, action="check_deps"),
             ToolSchema(
                 name="check_deps",
                 description="List installed Python packages",
@@ -188,7 +207,7 @@ class ToolManager:
         )
         self._register_with_schema(
             "list_env",
-            lambda **p: env_tool.run(action="list_env", **p),
+            partial(env_tool.run, action="list_env"),
             ToolSchema(
                 name="list_env",
                 description="Get Python environment information",
@@ -262,10 +281,17 @@ class ToolManager:
         name: str,
         func: Callable[..., ToolResult],
         schema: Optional[ToolSchema] = None,
+        concurrency_safe: bool = False,
     ):
         self.tools[name] = func
         if schema:
             self._schemas[name] = schema
+        if concurrency_safe:
+            self._concurrency_safe.add(name)
+
+    def is_concurrency_safe(self, name: str) -> bool:
+        """工具是否为只读、可与其他工具并发执行"""
+        return name in self._concurrency_safe
 
     def _handle_recover_from_error(self, **params) -> ToolResult:
         error = params.get("error", "Unknown error")
@@ -284,12 +310,14 @@ class ToolManager:
         return ToolResult(success=True, data=summary)
 
     def call(self, name: str, params: Dict[str, Any]) -> Any:
-        if name not in self.tools:
+        # 单次哈希探查：get 同时完成存在性检查与取函数
+        func = self.tools.get(name)
+        if func is None:
             available = ", ".join(sorted(self.tools.keys()))
             return f"Error: Tool '{name}' not found. Available tools: {available}"
 
         try:
-            result: ToolResult = self.tools[name](**(params or {}))
+            result: ToolResult = func(**(params or {}))
         except TypeError as e:
             return f"Error: Invalid parameters for tool '{name}': {e}"
         except Exception as e:
@@ -315,11 +343,11 @@ class ToolManager:
         return self._schemas.copy()
 
     def get_tools_prompt(self) -> str:
-        lines = []
-        for name in sorted(self._schemas.keys()):
-            schema = self._schemas[name]
-            lines.append(schema.to_prompt_string())
-        return "\n\n".join(lines)
+        # 单个扁平列表 + 一次 join；每个 schema 的渲染串本身已缓存
+        schemas = self._schemas
+        return "\n\n".join(
+            schemas[name].to_prompt_string() for name in sorted(schemas)
+        )
 
     def get_tools_json_schema(self) -> List[Dict[str, Any]]:
         return [schema.to_json_schema() for schema in self._schemas.values()]
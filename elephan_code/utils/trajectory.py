@@ -19,9 +19,12 @@ class TrajectoryRecorder:
 	支持参数：
 	  - save_dir: 可选，保存目录
 	  - filename: 可选，文件名
-	  - fmt: 'json' 或 'jsonl'（默认 json）
+	  - fmt: 'json'、'jsonl' 或 'msgpack'（默认 json）
 	  - logger: 可选结构化 logger，实现 `log(event_dict)` 方法
 
+	msgpack 为紧凑二进制格式，序列化开销和文件体积远小于 JSON，
+	适合高频轨迹写入；需要安装可选依赖 msgpack。
+
 	用法：
 	  recorder = TrajectoryRecorder(save_dir="./runs", fmt='jsonl', logger=logger)
 	"""
@@ -30,8 +33,11 @@ class TrajectoryRecorder:
 		self.save_dir = save_dir
 		self.filename = filename
 		self.fmt = fmt.lower()
-		if self.fmt not in ("json", "jsonl"):
-			raise ValueError("fmt must be 'json' or 'jsonl'")
+		if self.fmt not in ("json", "jsonl", "msgpack"):
+			raise ValueError("fmt must be 'json', 'jsonl' or 'msgpack'")
+		if self.fmt == "msgpack":
+			# 提前校验可选依赖，避免运行结束时才发现保存失败
+			self._get_msgpack()
 
 		self.logger = logger
 		self._events: List[TrajectoryEvent] = []
@@ -82,10 +88,27 @@ class TrajectoryRecorder:
 	def get_trajectory(self) -> List[Dict[str, Any]]:
 		return [asdict(e) for e in self._events]
 
+	@staticmethod
+	def _get_msgpack():
+		try:
+			import msgpack
+		except ImportError:
+			raise ImportError(
+				"msgpack is required for fmt='msgpack'. Install with: pip install msgpack"
+			)
+		return msgpack
+
 	def save(self, path: Optional[str] = None):
 		path = path or self._auto_path()
 		os.makedirs(os.path.dirname(path), exist_ok=True)
-		if self.fmt == "json":
+		if self.fmt == "msgpack":
+			msgpack = self._get_msgpack()
+			# 追加式二进制流：header 后逐事件 pack，可用 Unpacker 流式读回
+			with open(path, 'wb') as f:
+				f.write(msgpack.packb({"task": getattr(self, '_task', None), "meta": self.meta}))
+				for e in self.get_trajectory():
+					f.write(msgpack.packb(e))
+		elif self.fmt == "json":
 			with open(path, 'w', encoding='utf-8') as f:
 				json.dump({"task": getattr(self, '_task', None), "events": self.get_trajectory()}, f, ensure_ascii=False, indent=2)
 		else:
@@ -98,12 +121,18 @@ class TrajectoryRecorder:
 
 		return path
 
+	def export_json(self, path: str):
+		"""把已缓冲的轨迹导出为 JSON 文件，便于人工检查二进制轨迹"""
+		with open(path, 'w', encoding='utf-8') as f:
+			json.dump({"task": getattr(self, '_task', None), "events": self.get_trajectory()}, f, ensure_ascii=False, indent=2)
+		return path
+
 	def _auto_path(self) -> str:
 		if self.filename:
 			name = self.filename
 		else:
 			ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-			ext = "jsonl" if self.fmt == "jsonl" else "json"
+			ext = {"jsonl": "jsonl", "msgpack": "msgpack"}.get(self.fmt, "json")
 			name = f"trajectory_{ts}.{ext}"
 		if self.save_dir:
 			return os.path.join(self.save_dir, name)
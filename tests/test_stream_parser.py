@@ -0,0 +1,44 @@
+import json
+
+from elephan_code.llm.stream_parser import StreamingJsonParser
+
+
+def test_consume_completes_and_matches_full_parse():
+    raw = '{"thought": "look at {braces} in strings", "action": {"name": "finish", "parameters": {}}}'
+    parser = StreamingJsonParser()
+
+    done = False
+    for i in range(0, len(raw), 7):
+        done = parser.consume(raw[i : i + 7])
+
+    assert done and parser.done
+    assert parser.get() == json.loads(raw)
+
+
+def test_partial_snapshot_while_thought_is_growing():
+    parser = StreamingJsonParser()
+    parser.consume('{"thought": "reading the fi')
+
+    snapshot = parser.get()
+    assert snapshot == {"thought": "reading the fi"}
+    assert not parser.done
+
+
+def test_skips_leading_prose_and_trailing_text():
+    parser = StreamingJsonParser()
+    parser.consume("Sure, here is the plan:\n```json\n")
+    assert parser.get() is None
+
+    done = parser.consume('{"thought": "t"}\n``` hope that helps')
+    assert done
+    assert parser.text() == '{"thought": "t"}'
+    assert parser.get() == {"thought": "t"}
+
+
+def test_incomplete_key_returns_none_until_closable():
+    parser = StreamingJsonParser()
+    parser.consume('{"thought":')
+    assert parser.get() is None
+
+    parser.consume(' "ok"')
+    assert parser.get() == {"thought": "ok"}
@@ -39,3 +39,25 @@ def test_trajectory_jsonl():
     assert len(text) >= 2
     header = json.loads(text[0])
     assert header.get("task") == "t2"
+
+
+def test_trajectory_msgpack():
+    import pytest
+    msgpack = pytest.importorskip("msgpack")
+
+    tmpdir = tempfile.TemporaryDirectory()
+    out_dir = os.path.join(tmpdir.name, "runs3")
+    rec = TrajectoryRecorder(save_dir=str(out_dir), fmt="msgpack")
+    rec.start("t3")
+    rec.record_action("a", {"p": 3})
+    rec.record_observation("ok")
+    rec.end(status="done")
+
+    files = os.listdir(out_dir)
+    assert len(files) == 1
+    path = os.path.join(out_dir, files[0])
+    unpacker = msgpack.Unpacker(open(path, "rb"), raw=False)
+    header = next(unpacker)
+    assert header["task"] == "t3"
+    events = list(unpacker)
+    assert any(e["phase"] == "action" for e in events)